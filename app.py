@@ -1,32 +1,47 @@
 import streamlit as st
 import pandas as pd
-import json
-import plotly.graph_objects as go
+import numpy as np
 import os
-from datetime import datetime, timedelta, date
+import threading
+from datetime import timedelta, date
 import calendar
-import datetime as dt
-import yfinance as yf
-import plotly.graph_objects as go
 
 import streamlit_authenticator as stauth
 
 # Vos modules perso
-from data_cleaner import load_and_clean_csv, update_historical_data
+from data_cleaner import import_csv_in_batches, import_csv_files, add_trade_metrics
+import trade_store
+import journal_store
+import market_data
+import perf
+from trade_filters import TradeIndex, sort_positions
+from daily_rollup import DailyRollup
+from timing_cube import TimingCube
+from target_simulator import default_grid, simulate_stop_target
+from monte_carlo import run_monte_carlo, METHODS
+from figure_cache import FigureCache
 from utils_visuals import (
     plot_equity_curve,
+    plot_equity_vs_market,
     plot_drawdown_curve,
     plot_gain_loss_pie,
     plot_asset_distribution,
     plot_avg_duration_per_day,
     plot_return_vs_duration,
-    compute_stats_dict,
+    TradeAnalytics,
     plot_pnl_by_hour,
     plot_pnl_by_day_of_week,
+    plot_pnl_heatmap_weekday_hour,
     plot_daily_pnl,
     plot_daily_drawdown,
     plot_histogram_mae_mfe_etd,
     plot_scatter_mfe_vs_profit,
+    plot_stop_target_heatmap,
+    plot_monte_carlo_bands,
+    plot_monte_carlo_drawdowns,
+    STOP_TARGET_METRICS,
+    plot_rolling_metrics,
+    ROLLING_UNITS,
 )
 
 
@@ -101,6 +116,9 @@ elif authentication_status is None:
 authenticator.logout("🚪 Se déconnecter", "sidebar")
 st.sidebar.success(f"Connecté en tant que {name}")
 
+# Mesure du rerun (durée / lignes / mémoire par étape), journalisée dans data/.perf/
+perf.start_rerun(username)
+
 st.success(f"Bienvenue {name} 👋")
 
 # ─────────────────────────────────────────────────────────────────────────
@@ -109,32 +127,59 @@ st.success(f"Bienvenue {name} 👋")
 user_data_dir = os.path.join("data", username)  
 os.makedirs(user_data_dir, exist_ok=True)
 
-data_file = os.path.join(user_data_dir, "trades_historique.csv")
-journal_file = os.path.join(user_data_dir, "journal_notes.json")
+# ─────────────────────────────────────────────────────────────────────────
+# Historique : stockage Parquet par mois (migration automatique de l'ancien CSV)
+# ─────────────────────────────────────────────────────────────────────────
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_history_summary(user_dir, version):
+    return trade_store.store_summary(user_dir)
+
 
-# Initialisation si inexistant
-if not os.path.exists(data_file):
-    pd.DataFrame(columns=[
-        "Entry time", "Exit time", "Instrument", "Market pos.",
-        "Entry price", "Exit price", "Qty", "Profit",
-        "MAE", "MFE", "ETD"
-    ]).to_csv(data_file, index=False)
+@st.cache_resource(show_spinner=False)
+def history_slot(user_dir):
+    # Un seul historique en mémoire par utilisateur (et non un par sélection de mois).
+    # Version sentinelle : store_version vaut None pour un store vide, qui doit être chargé aussi.
+    return {"lock": threading.Lock(), "version": object(), "months": (), "index": None}
+
+
+def load_history(user_dir, version, months):
+    # L'historique chargé est réutilisé tant que la version du store n'a pas changé et
+    # qu'il couvre les mois demandés (TradeIndex.select tranche ensuite par dates).
+    # Mois manquants : rechargement de l'union avec les mois déjà chargés, pour que deux
+    # onglets sur des périodes différentes ne se remplacent pas à chaque rerun.
+    # Nouvelle version : rechargement des seuls mois demandés. L'index est partagé
+    # entre sessions (pas de copie) : ses trades ne doivent jamais être modifiés.
+    slot = history_slot(user_dir)
+    with slot["lock"]:
+        if slot["version"] != version:
+            load_months = tuple(months)
+        elif not set(months) <= set(slot["months"]):
+            load_months = tuple(sorted(set(slot["months"]) | set(months)))
+        else:
+            return slot["index"]
+        df = add_trade_metrics(trade_store.read_partitions(user_dir, list(load_months)))
+        slot.update(version=version, months=load_months, index=TradeIndex(df))
+        return slot["index"]
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def load_rollup(user_dir, version):
+    # Agrégats journaliers maintenus à l'import : stats et graphiques journaliers sans relire les trades
+    return DailyRollup(trade_store.read_aggregate(user_dir, "rollup"))
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def load_timing_cube(user_dir, version):
+    # Cube instrument × position × jour de semaine × heure, maintenu à l'import
+    return TimingCube(trade_store.read_aggregate(user_dir, "timing"))
 
-if not os.path.exists(journal_file):
-    with open(journal_file, "w") as f:
-        json.dump({}, f)
 
-# ─────────────────────────────────────────────────────────────────────────
-# Lecture de l'historique
-# ─────────────────────────────────────────────────────────────────────────
 try:
-    if os.path.exists(data_file):
-        df_histo = pd.read_csv(data_file, parse_dates=["Entry time", "Exit time"])
-        df_histo = df_histo[pd.notnull(df_histo["Entry time"])]
-        df_histo["Instrument"] = df_histo["Instrument"].str.extract(r"^([A-Z]+)")
-    else:
-        st.warning("Aucun fichier d'historique trouvé pour cet utilisateur.")
-        st.stop()
+    with perf.stage("history_summary"):
+        trade_store.migrate_csv_history(user_data_dir)
+        trade_store.ensure_aggregates(user_data_dir)
+        history_version = trade_store.store_version(user_data_dir)
+        history_summary = load_history_summary(user_data_dir, history_version)
 except Exception as e:
     st.error(f"Erreur lors du chargement du fichier historique : {e}")
     st.stop()
@@ -163,125 +208,183 @@ st.header("👀 Filtres")
 col_f1, col_f2, col_f3 = st.columns(3)
 
 with col_f1:
-    instruments = df_histo["Instrument"].unique().tolist()
+    instruments = pd.Series(history_summary["instruments"], dtype=object).str.extract(r"^([A-Z]+)")[0]
+    instruments = instruments.dropna().unique().tolist()
     instrument = st.selectbox("🇺🇸 Instrument", ["Tous"] + instruments)
 
 with col_f2:
-    directions = df_histo["Market pos."].unique().tolist()
+    directions = history_summary["directions"]
     direction = st.selectbox("📌 Positions", ["Tous"] + directions)
 
 with col_f3:
-    if not df_histo["Entry time"].dropna().empty:
-        default_start = pd.to_datetime(df_histo["Entry time"]).min().date()
-        default_end = pd.to_datetime(df_histo["Entry time"]).max().date()
+    if history_summary["start"] is not None:
+        default_start = history_summary["start"].date()
+        default_end = history_summary["end"].date()
     else:
         default_start = date.today() - timedelta(days=30)
         default_end = date.today()
 
     date_range = st.date_input("📅 Période", (default_start, default_end))
 
-# Application des filtres
-df_filtered = df_histo.copy()
-
-if instrument != "Tous":
-    df_filtered = df_filtered[df_filtered["Instrument"] == instrument]
-if direction != "Tous":
-    df_filtered = df_filtered[df_filtered["Market pos."] == direction]
-
 if isinstance(date_range, tuple) and len(date_range) == 2:
     start_date, end_date = date_range
 elif isinstance(date_range, date):
     start_date = end_date = date_range
 else:
-    start_date = df_histo["Entry time"].min().date()
-    end_date = df_histo["Entry time"].max().date()
+    start_date, end_date = default_start, default_end
+
+# Lecture de l'historique : seules les partitions des mois de la période sont chargées
+try:
+    history_months = tuple(trade_store.list_months(user_data_dir, start_date, end_date))
+    with perf.stage("history_load") as stage_info:
+        history_index = load_history(user_data_dir, history_version, history_months)
+        stage_info["rows"] = len(history_index)
+except Exception as e:
+    st.error(f"Erreur lors du chargement du fichier historique : {e}")
+    st.stop()
 
-if not df_filtered.empty and pd.api.types.is_datetime64_any_dtype(df_filtered["Entry time"]):
-    df_filtered = df_filtered[
-        (df_filtered["Entry time"].dt.date >= start_date) &
-        (df_filtered["Entry time"].dt.date <= end_date)
-    ]
+# Application des filtres : tranche par dates (searchsorted) + codes instrument / position
+with perf.stage("filter") as stage_info:
+    df_filtered = history_index.select(instrument, direction, start_date, end_date)
+    stage_info["rows"] = len(df_filtered)
 
 # ─────────────────────────────────────────────────────────────────────────
 # Sidebar : Upload CSV
 # ─────────────────────────────────────────────────────────────────────────
 st.sidebar.markdown("## 📂 Import Zone")
-uploaded_file = st.sidebar.file_uploader("", type=["csv"])
-
-if uploaded_file:
-    df_new = load_and_clean_csv(uploaded_file)
-
-    # Fusion avec historique utilisateur (sans doublons)
-    user_csv_path = os.path.join(user_data_dir, "trades_historique.csv")
-    df_combined, new_count = update_historical_data(df_new, user_csv_path)
-    st.sidebar.success(f"{new_count} nouveaux trades ajoutés à l'historique. Recharge la page pour voir les changements.")
-
-    if os.path.exists(data_file):
-        df_existing = pd.read_csv(data_file, parse_dates=["Entry time", "Exit time"])
+uploaded_files = st.sidebar.file_uploader("", type=["csv"], accept_multiple_files=True)
+
+# Les fichiers restent dans le file_uploader d'un rerun à l'autre : on ne les importe qu'une fois.
+# Un fichier en erreur n'est pas marqué importé, mais n'est pas retenté à chaque rerun :
+# il faut le déposer à nouveau (les trades déjà validés seront ignorés).
+imported_ids = st.session_state.setdefault("imported_file_ids", set())
+failed_ids = st.session_state.setdefault("failed_file_ids", set())
+new_files = [f for f in uploaded_files if f.file_id not in imported_ids | failed_ids]
+
+if len(new_files) == 1:
+    # Import en flux par paquets (mémoire bornée), dédoublonné contre l'historique
+    uploaded_file = new_files[0]
+    import_progress = st.sidebar.progress(0.0, text="⏳ Import en cours…")
+    new_count, error = import_csv_in_batches(
+        uploaded_file,
+        user_data_dir,
+        on_progress=lambda fraction: import_progress.progress(fraction, text=f"⏳ Import en cours… {fraction:.0%}"),
+    )
+    if error is None:
+        imported_ids.add(uploaded_file.file_id)
+        st.session_state.import_message = f"{new_count} nouveaux trades ajoutés à l'historique."
     else:
-        df_existing = pd.DataFrame()
-
-    df_combined = pd.concat([df_existing, df_new]).drop_duplicates()
-    new_trades_count = len(df_combined) - len(df_existing)
-
-    df_combined.to_csv(data_file, index=False)
-
-    st.sidebar.success(f"{new_trades_count} nouveaux trades ajoutés à l'historique. Recharge la page pour voir les changements.")
+        failed_ids.add(uploaded_file.file_id)
+        st.session_state.setdefault("import_errors", []).append(
+            f"❌ {uploaded_file.name} : {error} ({new_count} trades validés avant l'erreur)"
+        )
+    # Le store a changé de version : le rerun recharge l'historique à jour
+    st.rerun()
+
+elif new_files:
+    # Plusieurs exports : nettoyage en parallèle, un seul dédoublonnage et une seule validation
+    with st.sidebar, st.spinner(f"⏳ Import de {len(new_files)} fichiers…"):
+        added, errors = import_csv_files([(f.name, f.getvalue()) for f in new_files], user_data_dir)
+    for position, f in enumerate(new_files):
+        (failed_ids if position in errors else imported_ids).add(f.file_id)
+    for position, error in errors.items():
+        st.session_state.setdefault("import_errors", []).append(f"❌ {new_files[position].name} : {error}")
+    details = "\n".join(
+        f"- {f.name} : {count}" for position, (f, count) in enumerate(zip(new_files, added)) if position not in errors
+    )
+    st.session_state.import_message = f"{sum(added)} nouveaux trades ajoutés à l'historique.\n\n{details}"
+    st.rerun()
+
+for import_error in st.session_state.pop("import_errors", []):
+    st.sidebar.error(import_error)
+if "import_message" in st.session_state:
+    st.sidebar.success(st.session_state.pop("import_message"))
 
 # ─────────────────────────────────────────────────────────────────────────
 # Sidebar : Journal de séance
+# Zones st.fragment (journal, dernière session, listing) : leurs widgets ne relancent
+# que leur propre zone, sans recharger l'historique ni reconstruire les graphiques
 # ─────────────────────────────────────────────────────────────────────────
 st.sidebar.markdown("---")
 st.sidebar.markdown("## 📓 Journal de séance")
 
-image_dir = os.path.join(user_data_dir, "journal_images")
-os.makedirs(image_dir, exist_ok=True)
+# Migration unique de l'ancien journal_notes.json vers la base SQLite
+journal_store.migrate_json_journal(user_data_dir)
 
-with open(journal_file, "r") as f:
-    journal = json.load(f)
 
-# Convertir si ancien format (v = string)
-for k, v in journal.items():
-    if isinstance(v, str):
-        journal[k] = {"text": v, "images": []}
+@st.fragment
+def journal_sidebar():
+    with perf.fragment("journal", username):
+        aujourd_hui = pd.to_datetime("today").normalize()
+        cle_du_jour = aujourd_hui.date().isoformat()
+        note_du_jour = journal_store.get_note(user_data_dir, cle_du_jour)
 
-aujourd_hui = pd.to_datetime("today").normalize()
-cle_du_jour = str(aujourd_hui)
+        if note_du_jour is None:
+            st.warning("📝 Tu n’as pas encore rempli ta note de trading aujourd’hui !")
 
-if cle_du_jour not in journal:
-    st.sidebar.warning("📝 Tu n’as pas encore rempli ta note de trading aujourd’hui !")
+        note = st.text_area(
+            "✍️ Ta note du jour",
+            value=note_du_jour["text"] if note_du_jour else "",
+            height=150
+        )
+        images = st.file_uploader("📸 Ajouter des captures", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
 
-note = st.sidebar.text_area(
-    "✍️ Ta note du jour",
-    value=journal.get(cle_du_jour, {}).get("text", ""),
-    height=150
-)
-images = st.sidebar.file_uploader("📸 Ajouter des captures", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
+        if st.button("💾 Sauvegarder ma note", use_container_width=True):
+            # Captures adressées par contenu : une image déjà enregistrée n'est ni réécrite ni dupliquée
+            saved_images = note_du_jour["images"] if note_du_jour else []
+            for img in images:
+                try:
+                    img_path = journal_store.store_image(user_data_dir, img.getvalue(), img.name)
+                except OSError:  # PIL.UnidentifiedImageError compris : fichier corrompu ou non supporté
+                    st.session_state.setdefault("journal_warnings", []).append(
+                        f"⚠️ {img.name} : image illisible, capture ignorée."
+                    )
+                    continue
+                if img_path not in saved_images:
+                    saved_images.append(img_path)
 
-if st.sidebar.button("💾 Sauvegarder ma note", use_container_width=True):
-    saved_images = []
-    for img in images:
-        img_path = os.path.join(image_dir, f"{cle_du_jour}_{img.name}")
-        with open(img_path, "wb") as f:
-            f.write(img.getbuffer())
-        saved_images.append(img_path)
+            journal_store.upsert_note(user_data_dir, cle_du_jour, note, saved_images)
+            # Rerun complet : la dernière session et le listing affichent la note enregistrée
+            st.session_state.journal_message = "Note enregistrée avec succès 🎉"
+            st.rerun()
 
-    journal[cle_du_jour] = {"text": note, "images": saved_images}
-    with open(journal_file, "w") as f:
-        json.dump(journal, f)
-    st.sidebar.success("Note enregistrée avec succès 🎉")
+        for journal_warning in st.session_state.pop("journal_warnings", []):
+            st.warning(journal_warning)
+        if "journal_message" in st.session_state:
+            st.success(st.session_state.pop("journal_message"))
 
 
-# ─────────────────────────────────────────────────────────────────────────
-# Calcul de colonnes supplémentaires
-# ─────────────────────────────────────────────────────────────────────────
-if not df_filtered.empty:
-    df_filtered["Durée (min)"] = (
-        df_filtered["Exit time"] - df_filtered["Entry time"]
-    ).dt.total_seconds() / 60
-    df_filtered["Rendement (%)"] = (
-        df_filtered["Profit"] / (df_filtered["Entry price"] * df_filtered["Qty"])
-    ) * 100
+with st.sidebar:
+    journal_sidebar()
+
+
+# Tri, cumuls et agrégats calendaires calculés une seule fois pour tous les graphiques
+# (séries journalières et timing lus dans les agrégats persistants)
+with perf.stage("analytics", len(df_filtered)):
+    daily_stats = load_rollup(user_data_dir, history_version)
+    timing_cube = load_timing_cube(user_data_dir, history_version)
+    analytics = TradeAnalytics(
+        df_filtered,
+        daily=daily_stats.daily(instrument, direction, start_date, end_date),
+        timing=timing_cube.timing(instrument, direction, start_date, end_date),
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def load_figure_cache():
+    # Un seul cache LRU de figures par processus, partagé entre sessions (plafond FIGURE_CACHE_MB)
+    return FigureCache()
+
+
+# Figures réutilisées d'un rerun à l'autre tant que utilisateur, version du store et filtres
+# sont inchangés : un rerun venu du journal ou de la navigation ne reconstruit aucun graphique
+figure_cache = load_figure_cache()
+figure_signature = (username, history_version, instrument, direction, start_date, end_date)
+
+
+def cached_figure(plot, data, *args, key=()):
+    # key : paramètres dont dépend data sans être passés au graphique (Monte Carlo…)
+    return figure_cache.get_or_build(figure_signature + (plot.__name__,) + args + key, lambda: plot(data, *args))
 
 # ─────────────────────────────────────────────────────────────────────────
 # Profit / Risk Zone
@@ -290,19 +393,59 @@ st.markdown("## 🎰 Profit / Risk Zone")
 col1, col2 = st.columns(2)
 
 with col1:
-    st.plotly_chart(plot_equity_curve(df_filtered), use_container_width=True, key="equity")
+    st.plotly_chart(cached_figure(plot_equity_curve, analytics), use_container_width=True, key="equity")
 
 with col2:
-    st.plotly_chart(plot_drawdown_curve(df_filtered), use_container_width=True, key='drawdown')
+    st.plotly_chart(cached_figure(plot_drawdown_curve, analytics), use_container_width=True, key='drawdown')
+
+# Statistiques glissantes, sur le même axe "Trade #" que la courbe de capital
+col_roll1, col_roll2 = st.columns([1, 4])
+with col_roll1:
+    rolling_unit = st.radio("🔁 Fenêtre glissante", ROLLING_UNITS, horizontal=True, key="rolling_unit")
+    rolling_window = st.number_input(
+        f"Nombre de {rolling_unit}",
+        min_value=2 if rolling_unit == "trades" else 1,
+        value=50 if rolling_unit == "trades" else 30,
+        step=1,
+        key=f"rolling_window_{rolling_unit}",
+    )
+with col_roll2:
+    st.plotly_chart(cached_figure(plot_rolling_metrics, analytics, int(rolling_window), rolling_unit), use_container_width=True, key="rolling")
 
 col_daily1, col_daily2 = st.columns(2)
 with col_daily1:
-    st.plotly_chart(plot_daily_pnl(df_filtered), use_container_width=True, key="daily_pnl")
+    st.plotly_chart(cached_figure(plot_daily_pnl, analytics), use_container_width=True, key="daily_pnl")
 with col_daily2:
-    st.plotly_chart(plot_daily_drawdown(df_filtered), use_container_width=True, key="daily_drawdown")
+    st.plotly_chart(cached_figure(plot_daily_drawdown, analytics), use_container_width=True, key="daily_drawdown")
+
+
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def load_market_closes(symbols, start, end):
+    # Barres servies par le cache disque de market_data : le fournisseur n'est appelé
+    # que pour les plages jamais récupérées (ou expirées)
+    return market_data.closes(market_data.MarketDataCache(), symbols, start, end)
+
+
+# Comparaison aux marchés (instruments tradés + indice de référence), à la demande
+if not analytics.empty and st.toggle("🌍 Comparer aux marchés", key="market_overlay"):
+    traded = analytics.trades["Instrument"].dropna().unique()
+    market_symbols = tuple(dict.fromkeys(
+        [market_data.INSTRUMENT_SYMBOLS[i] for i in traded if i in market_data.INSTRUMENT_SYMBOLS]
+        + [market_data.BENCHMARK_SYMBOL]
+    ))
+    try:
+        with st.spinner("⏳ Chargement des données de marché…"):
+            with perf.stage("market_data"):
+                market_closes = load_market_closes(market_symbols, start_date, end_date)
+    except Exception as e:
+        st.warning(f"Données de marché indisponibles : {e}")
+    else:
+        # Hors cache de figures : les clôtures récentes se rafraîchissent (TTL des données de marché)
+        st.plotly_chart(plot_equity_vs_market(analytics, market_closes), use_container_width=True, key="equity_market")
 
 # Statistiques clés
-stats = compute_stats_dict(df_filtered)
+with perf.stage("stats"):
+    stats = daily_stats.range_stats(instrument, direction, start_date, end_date)
 
 def render_stat_card(title, value, emoji):
     return f"""
@@ -335,43 +478,30 @@ st.markdown("## 🏄‍♂️ Timing Zone")
 
 col1b, col2b = st.columns(2)
 with col1b:
-    st.plotly_chart(plot_avg_duration_per_day(df_filtered), use_container_width=True, key="avg_duration")
+    st.plotly_chart(cached_figure(plot_avg_duration_per_day, analytics), use_container_width=True, key="avg_duration")
 with col2b:
-    st.plotly_chart(plot_return_vs_duration(df_filtered), use_container_width=True, key="return_duration")
+    st.plotly_chart(cached_figure(plot_return_vs_duration, analytics), use_container_width=True, key="return_duration")
 
 col3, col4 = st.columns(2)
 with col3:
-    st.plotly_chart(plot_pnl_by_day_of_week(df_filtered), use_container_width=True, key="pnl_day")
+    st.plotly_chart(cached_figure(plot_pnl_by_day_of_week, analytics), use_container_width=True, key="pnl_day")
 with col4:
-    st.plotly_chart(plot_pnl_by_hour(df_filtered), use_container_width=True, key="pnl_hour")
+    st.plotly_chart(cached_figure(plot_pnl_by_hour, analytics), use_container_width=True, key="pnl_hour")
+
+st.plotly_chart(cached_figure(plot_pnl_heatmap_weekday_hour, analytics), use_container_width=True, key="pnl_heatmap")
 
 # Statistiques Timing
 st.markdown("---")
 st.subheader("📊 Statistiques Timing")
 
-if all(col in df_filtered.columns for col in ["Durée (min)", "Entry time", "Profit"]):
-    avg_duration = round(df_filtered["Durée (min)"].mean(), 2)
-    active_days = df_filtered["Entry time"].dt.date.nunique()
-
-    try:
-        best_day = df_filtered.groupby(df_filtered["Entry time"].dt.day_name())["Profit"].sum().idxmax()
-    except ValueError:
-        best_day = "N/A"
-
-    try:
-        worst_day = df_filtered.groupby(df_filtered["Entry time"].dt.day_name())["Profit"].sum().idxmin()
-    except ValueError:
-        worst_day = "N/A"
-
-    try:
-        best_hour = df_filtered.groupby(df_filtered["Entry time"].dt.hour)["Profit"].sum().idxmax()
-    except ValueError:
-        best_hour = "N/A"
+if not analytics.empty:
+    avg_duration = round(analytics.duration.mean(), 2)
+    active_days = len(analytics.daily)
 
-    try:
-        worst_hour = df_filtered.groupby(df_filtered["Entry time"].dt.hour)["Profit"].sum().idxmin()
-    except ValueError:
-        worst_hour = "N/A"
+    best_day = calendar.day_name[analytics.by_weekday.idxmax()]
+    worst_day = calendar.day_name[analytics.by_weekday.idxmin()]
+    best_hour = analytics.hourly.idxmax()
+    worst_hour = analytics.hourly.idxmin()
 else:
     avg_duration = 0
     active_days = 0
@@ -395,9 +525,9 @@ st.markdown("## 🧀 Distribution")
 
 col5, col6 = st.columns(2)
 with col5:
-    st.plotly_chart(plot_asset_distribution(df_filtered), use_container_width=True, key="asset_distr")
+    st.plotly_chart(cached_figure(plot_asset_distribution, analytics), use_container_width=True, key="asset_distr")
 with col6:
-    st.plotly_chart(plot_gain_loss_pie(df_filtered), use_container_width=True, key="gain_loss")
+    st.plotly_chart(cached_figure(plot_gain_loss_pie, analytics), use_container_width=True, key="gain_loss")
 
 # ─────────────────────────────────────────────────────────────────────────
 # Optimisation des targets
@@ -405,8 +535,8 @@ with col6:
 st.markdown("---")
 st.markdown("## 👨‍🔬 Optimisation des targets")
 
-st.plotly_chart(plot_histogram_mae_mfe_etd(df_filtered), use_container_width=True, key="hist_mfe")
-st.plotly_chart(plot_scatter_mfe_vs_profit(df_filtered), use_container_width=True, key="mfe_profit")
+st.plotly_chart(cached_figure(plot_histogram_mae_mfe_etd, analytics), use_container_width=True, key="hist_mfe")
+st.plotly_chart(cached_figure(plot_scatter_mfe_vs_profit, analytics), use_container_width=True, key="mfe_profit")
 
 mae_mean = round(df_filtered["MAE"].mean(), 2) if "MAE" in df_filtered else 0
 mfe_mean = round(df_filtered["MFE"].mean(), 2) if "MFE" in df_filtered else 0
@@ -419,13 +549,135 @@ cols_targets[1].markdown(render_stat_card("MFE moyen", f"${mfe_mean}", "🍾"),
 cols_targets[2].markdown(render_stat_card("ETD moyen", f"${etd_mean}", "🤺"), unsafe_allow_html=True)
 cols_targets[3].markdown(render_stat_card("Ratio MFE/MAE", mfe_mae_ratio, "🧑‍⚖️"), unsafe_allow_html=True)
 
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def simulate_targets(user_dir, version, instrument, direction, start, end, _df):
+    # Grille stop × target rejouée sur les trades filtrés ; clé = filtres + version du store
+    mae = _df["MAE"].to_numpy(dtype=float)
+    mfe = _df["MFE"].to_numpy(dtype=float)
+    stops, targets = default_grid(mae, mfe)
+    return simulate_stop_target(mae, mfe, _df["Profit"].to_numpy(dtype=float), stops, targets)
+
+
+# Simulation : que serait devenu chaque trade avec un autre stop / target ?
+if not df_filtered.empty and {"MAE", "MFE"} <= set(df_filtered.columns):
+    target_metric = st.radio(
+        "🎯 Simulation stop / target",
+        list(STOP_TARGET_METRICS),
+        format_func=STOP_TARGET_METRICS.get,
+        horizontal=True,
+        key="target_metric",
+    )
+    with st.spinner("⏳ Simulation de la grille stop / target…"):
+        with perf.stage("stop_target_grid", len(df_filtered)):
+            target_grid = simulate_targets(
+                user_data_dir, history_version, instrument, direction, start_date, end_date, df_filtered
+            )
+    st.plotly_chart(cached_figure(plot_stop_target_heatmap, target_grid, target_metric), use_container_width=True, key="stop_target")
+    st.caption("Quand MAE et MFE dépassent tous deux le stop et le target, le stop est supposé touché en premier.")
+
+# ─────────────────────────────────────────────────────────────────────────
+# Monte Carlo
+# ─────────────────────────────────────────────────────────────────────────
+st.markdown("---")
+st.markdown("## 🎲 Monte Carlo")
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def simulate_monte_carlo(user_dir, version, instrument, direction, start, end, n_sims, method, seed, ruin_loss, _profit):
+    # Tirages sur les P&L des trades filtrés ; clé = filtres + paramètres + version du store
+    return run_monte_carlo(_profit, n_sims=n_sims, method=method, seed=seed, ruin_loss=ruin_loss)
+
+
+col_mc1, col_mc2, col_mc3, col_mc4 = st.columns(4)
+with col_mc1:
+    mc_sims = st.selectbox("Tirages", [1_000, 10_000, 50_000], index=1, key="mc_sims")
+with col_mc2:
+    mc_method = st.radio("Méthode", METHODS, horizontal=True, key="mc_method")
+with col_mc3:
+    mc_seed = st.number_input("Graine", min_value=0, value=42, step=1, key="mc_seed")
+with col_mc4:
+    mc_ruin = st.number_input("Capital du compte ($)", min_value=0.0, value=5_000.0, step=500.0, key="mc_ruin")
+
+if analytics.empty:
+    st.info("Aucun trade sur la période filtrée.")
+elif st.toggle("Lancer la simulation", key="mc_enabled"):
+    mc_params = (mc_sims, mc_method, int(mc_seed), mc_ruin)
+    with st.spinner("⏳ Simulation Monte Carlo…"):
+        with perf.stage("monte_carlo", len(df_filtered)):
+            mc_result = simulate_monte_carlo(
+                user_data_dir, history_version, instrument, direction, start_date, end_date,
+                *mc_params, analytics.profit,
+            )
+
+    col_mc5, col_mc6 = st.columns(2)
+    with col_mc5:
+        st.plotly_chart(cached_figure(plot_monte_carlo_bands, mc_result, key=mc_params), use_container_width=True, key="mc_bands")
+    with col_mc6:
+        st.plotly_chart(cached_figure(plot_monte_carlo_drawdowns, mc_result, key=mc_params), use_container_width=True, key="mc_drawdowns")
+
+    cols_mc = st.columns(4)
+    cols_mc[0].markdown(render_stat_card("Max DD médian", f"${np.median(mc_result['max_drawdown']):.2f}", "🧯"), unsafe_allow_html=True)
+    cols_mc[1].markdown(render_stat_card("Max DD (5 % pire)", f"${np.percentile(mc_result['max_drawdown'], 5):.2f}", "🌪️"), unsafe_allow_html=True)
+    cols_mc[2].markdown(render_stat_card("P&L final médian", f"${np.median(mc_result['final_pnl']):.2f}", "🎯"), unsafe_allow_html=True)
+    ruin = mc_result["risk_of_ruin"]
+    cols_mc[3].markdown(render_stat_card("Risque de ruine", f"{ruin * 100:.1f}%" if ruin is not None else "N/A", "☠️"), unsafe_allow_html=True)
+
 # ─────────────────────────────────────────────────────────────────────────
 # Liste des trades filtrés
 # ─────────────────────────────────────────────────────────────────────────
 st.markdown("---")
 st.subheader("📋 Liste des trades")
 
-st.dataframe(df_filtered.sort_values("Entry time", ascending=False), use_container_width=True)
+# Tri côté serveur, seule la page affichée est envoyée au navigateur
+table_columns = df_filtered.columns.tolist()
+col_t1, col_t2, col_t3, col_t4 = st.columns([2, 1, 4, 1])
+with col_t1:
+    sort_column = st.selectbox("Trier par", table_columns, index=table_columns.index("Entry time"))
+with col_t2:
+    sort_ascending = st.toggle("Croissant", value=False)
+with col_t3:
+    shown_columns = st.multiselect("Colonnes", table_columns, default=table_columns)
+with col_t4:
+    page_size = st.selectbox("Lignes", [50, 100, 250, 500], index=1)
+
+n_pages = max(1, -(-len(df_filtered) // page_size))
+page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+
+# L'ordre de tri est conservé en session tant que les filtres et le tri ne changent pas
+table_signature = (history_version, history_months, instrument, direction, start_date, end_date, sort_column, sort_ascending)
+if st.session_state.get("trade_table_signature") != table_signature:
+    st.session_state.trade_table_order = sort_positions(df_filtered, sort_column, sort_ascending)
+    st.session_state.trade_table_signature = table_signature
+
+page_positions = st.session_state.trade_table_order[(page - 1) * page_size:page * page_size]
+with perf.stage("st.dataframe", len(page_positions)):
+    st.dataframe(df_filtered.iloc[page_positions][shown_columns], use_container_width=True, hide_index=True)
+st.caption(f"{len(df_filtered)} trades — page {page}/{n_pages}")
+
+# ─────────────────────────────────────────────────────────────────────────
+# Captures d'une session : miniatures, pleine résolution seulement sur demande
+# ─────────────────────────────────────────────────────────────────────────
+def render_session_images(paths, key):
+    paths = [p for p in paths if os.path.exists(p)]
+    if not paths:
+        return
+
+    if st.toggle("🔍 Captures en pleine résolution", key=f"full_images_{key}"):
+        for path in paths:
+            try:
+                st.image(path, use_container_width=True)
+            except OSError:
+                st.warning(f"⚠️ Capture illisible : {os.path.basename(path)}")
+    else:
+        thumb_cols = st.columns(4)
+        for i, path in enumerate(paths):
+            try:
+                thumb = journal_store.thumbnail_path(user_data_dir, path)
+            except OSError:  # capture corrompue (PIL.UnidentifiedImageError compris) : avertissement
+                thumb_cols[i % 4].warning(f"⚠️ Capture illisible : {os.path.basename(path)}")
+                continue
+            thumb_cols[i % 4].image(thumb, use_container_width=True)
 
 # ─────────────────────────────────────────────────────────────────────────
 # Dernière Session (navigation sur les notes)
@@ -433,36 +685,45 @@ st.dataframe(df_filtered.sort_values("Entry time", ascending=False), use_contain
 st.markdown("---")
 st.subheader("🎞️ Dernière Session")
 
-dates_dispo = sorted(journal.keys())
-if len(dates_dispo) >= 1:
-    if "note_index" not in st.session_state:
-        st.session_state.note_index = len(dates_dispo) - 1
 
-    colA, colB, colC = st.columns([1,6,1])
-    with colA:
-        if st.button("⬅️", use_container_width=True) and st.session_state.note_index > 0:
-            st.session_state.note_index -= 1
+def step_note_index(step, n_days):
+    # Callback : l'index change avant le rendu, la note affichée suit chaque clic
+    st.session_state.note_index = min(max(st.session_state.note_index + step, 0), n_days - 1)
 
-    selected_date = dates_dispo[st.session_state.note_index]
-    selected_note = journal[selected_date]
 
-    with colB:
-        st.markdown(
-            f"<div style='text-align: center; font-size: 26px; padding-top: 6px;'>📅 {selected_date.split(' ')[0]}</div>",
-            unsafe_allow_html=True
-        )
+@st.fragment
+def last_session():
+    with perf.fragment("last_session", username):
+        dates_dispo = journal_store.list_days(user_data_dir)
+        if not dates_dispo:
+            st.info("👉 Ajoute au moins une note pour naviguer.")
+            return
 
-    with colC:
-        if st.button("➡️", use_container_width=True) and st.session_state.note_index < len(dates_dispo) - 1:
-            st.session_state.note_index += 1
+        if "note_index" not in st.session_state:
+            st.session_state.note_index = len(dates_dispo) - 1
+        st.session_state.note_index = min(st.session_state.note_index, len(dates_dispo) - 1)
 
-    st.markdown(f"> {selected_note['text']}")
+        colA, colB, colC = st.columns([1,6,1])
+        with colA:
+            st.button("⬅️", use_container_width=True, on_click=step_note_index, args=(-1, len(dates_dispo)))
+        with colC:
+            st.button("➡️", use_container_width=True, on_click=step_note_index, args=(1, len(dates_dispo)))
 
-    for path in selected_note.get("images", []):
-        st.image(path, use_container_width=True)
+        selected_date = dates_dispo[st.session_state.note_index]
+        selected_note = journal_store.get_note(user_data_dir, selected_date)
 
-else:
-    st.info("👉 Ajoute au moins une note pour naviguer.")
+        with colB:
+            st.markdown(
+                f"<div style='text-align: center; font-size: 26px; padding-top: 6px;'>📅 {selected_date.split(' ')[0]}</div>",
+                unsafe_allow_html=True
+            )
+
+        st.markdown(f"> {selected_note['text']}")
+
+        render_session_images(selected_note["images"], "last_session")
+
+
+last_session()
 
 # ─────────────────────────────────────────────────────────────────────────
 # Listing complet de toutes les sessions enregistrées
@@ -470,25 +731,49 @@ else:
 st.markdown("---")
 st.subheader("🧾 Listing de toutes les sessions enregistrées")
 
-records = []
-for d in sorted(journal.keys(), reverse=True):
-    note = journal[d]
-    preview_text = note["text"][:120] + ("..." if len(note["text"]) > 120 else "")
-    records.append({
-        "Date": d.split(" ")[0],
-        "Résumé": preview_text,
-        "Nb images": len(note.get("images", [])),
-        "Clé": d
-    })
-
-df_notes = pd.DataFrame(records)
-
-if not df_notes.empty:
-    for idx, row in df_notes.iterrows():
-        with st.expander(f"📅 {row['Date']} — {row['Résumé']}"):
-            st.markdown(f"### 🗒️ Note du {row['Date']}")
-            st.markdown(journal[row["Clé"]]["text"])
-            for path in journal[row["Clé"]].get("images", []):
-                st.image(path, use_container_width=True)
-else:
-    st.info("Aucune note à afficher.")
+# Une page de sessions à la fois : le poids de la page ne dépend pas du nombre de notes
+SESSIONS_PER_PAGE = 10
+
+
+@st.fragment
+def sessions_listing():
+    with perf.fragment("sessions_listing", username):
+        all_days = journal_store.list_days(user_data_dir)[::-1]
+        if not all_days:
+            st.info("Aucune note à afficher.")
+            return
+
+        n_session_pages = -(-len(all_days) // SESSIONS_PER_PAGE)
+        session_page = st.number_input("Page des sessions", min_value=1, max_value=n_session_pages, value=1, step=1)
+        page_days = all_days[(session_page - 1) * SESSIONS_PER_PAGE:session_page * SESSIONS_PER_PAGE]
+
+        for session_note in journal_store.list_notes(user_data_dir, page_days[-1], page_days[0], newest_first=True):
+            preview_text = session_note["text"][:120] + ("..." if len(session_note["text"]) > 120 else "")
+            with st.expander(f"📅 {session_note['day']} — {preview_text}"):
+                st.markdown(f"### 🗒️ Note du {session_note['day']}")
+                st.markdown(session_note["text"])
+                render_session_images(session_note["images"], session_note["day"])
+
+
+sessions_listing()
+
+# ─────────────────────────────────────────────────────────────────────────
+# Panneau perf (administrateurs : variable d'environnement DASHBOARD_ADMINS)
+# ─────────────────────────────────────────────────────────────────────────
+perf_record = perf.finish_rerun()
+admins = {u.strip() for u in os.environ.get("DASHBOARD_ADMINS", "").split(",") if u.strip()}
+
+if username in admins and st.sidebar.toggle("🛠️ Panneau perf", key="perf_panel"):
+    st.sidebar.markdown(
+        f"**Rerun : {perf_record['total_ms']:.0f} ms** · RSS {perf_record['rss_end_mb']:.0f} Mo "
+        f"({perf_record['rss_end_mb'] - perf_record['rss_start_mb']:+.1f})"
+    )
+    st.sidebar.dataframe(pd.DataFrame(perf_record["stages"]), hide_index=True, use_container_width=True)
+    cache_stats = figure_cache.stats()
+    st.sidebar.markdown(
+        f"**Cache figures** : {cache_stats['figures']} figures, {cache_stats['mb']} / {cache_stats['max_mb']} Mo · "
+        f"{cache_stats['hits']} réutilisées, {cache_stats['misses']} construites, {cache_stats['evictions']} évincées, "
+        f"{cache_stats['oversize']} trop grosses pour le cache"
+    )
+    st.sidebar.markdown("**Derniers reruns (tous utilisateurs)**")
+    st.sidebar.dataframe(perf.summarize_log(), hide_index=True, use_container_width=True)
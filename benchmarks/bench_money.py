@@ -0,0 +1,73 @@
+"""Benchmark : parse_money (apply cellule par cellule) vs parse_money_columns.
+
+Mesuré sur un export propre, puis avec --bad-ratio de cellules illisibles ("N/A"),
+qui passent par la relecture cellule par cellule de parse_money_columns.
+
+Usage : python benchmarks/bench_money.py [--rows 100000 1000000] [--bad-ratio 0.001]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_cleaner import MONETARY_COLUMNS, parse_money, parse_money_columns
+
+
+def make_money_frame(n_rows, seed=0, bad_ratio=0.0):
+    # Montants au format export NinjaTrader : "$1,234.50", "($12.00)", cellules vides,
+    # et une part bad_ratio de cellules illisibles
+    rng = np.random.default_rng(seed)
+    frame = {}
+    for col in MONETARY_COLUMNS:
+        if col == "Cum. net profit":
+            amounts = np.round(np.cumsum(rng.normal(0, 400, n_rows)), 2)
+        else:
+            amounts = np.round(rng.normal(0, 400, n_rows) / 1.25) * 1.25
+        text = np.where(
+            amounts < 0,
+            ["(${:,.2f})".format(-a) for a in amounts],
+            ["${:,.2f}".format(a) for a in amounts],
+        ).astype(object)
+        text[rng.random(n_rows) < 0.01] = np.nan
+        text[rng.random(n_rows) < bad_ratio] = "N/A"
+        frame[col] = text
+    return pd.DataFrame(frame)
+
+
+def bench(n_rows, bad_ratio=0.0):
+    df = make_money_frame(n_rows, bad_ratio=bad_ratio)
+
+    start = time.perf_counter()
+    expected = df.copy()
+    for col in MONETARY_COLUMNS:
+        expected[col] = expected[col].apply(parse_money)
+    t_apply = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = parse_money_columns(df.copy())
+    t_columns = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(expected, result)
+    return t_apply, t_columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--bad-ratio", type=float, default=0.001)
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'illisibles':>10} {'apply (s)':>10} {'parse_money_columns (s)':>24} {'gain':>7}")
+    for n_rows in args.rows:
+        for bad_ratio in (0.0, args.bad_ratio):
+            t_apply, t_columns = bench(n_rows, bad_ratio)
+            print(f"{n_rows:>10} {bad_ratio:>10.2%} {t_apply:>10.3f} {t_columns:>24.3f} {t_apply / t_columns:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
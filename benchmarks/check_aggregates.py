@@ -0,0 +1,109 @@
+"""Contrôle des agrégats persistés (daily_rollup, timing_cube) contre le calcul trade par trade.
+
+Un export synthétique (benchmarks/synthetic.py) est importé dans un store temporaire
+en plusieurs lots mélangés, pour exercer le remplacement des agrégats par mois. Pour
+chaque filtre (instrument, direction, période), on compare :
+  - DailyRollup.range_stats  à compute_stats_dict sur les trades filtrés
+  - DailyRollup.daily        à TradeAnalytics.daily
+  - TimingCube.timing        à TradeAnalytics.timing
+Les écarts sont listés et le script se termine en erreur s'il y en a.
+
+Usage : python benchmarks/check_aggregates.py [--rows 5000] [--batches 3] [--seed 0]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import trade_store
+import utils_visuals as uv
+from daily_rollup import DailyRollup
+from data_cleaner import add_trade_metrics, load_and_clean_csv
+from synthetic import export_path
+from timing_cube import TimingCube
+from trade_filters import TradeIndex
+
+TOLERANCE = 0.011  # les statistiques affichées sont arrondies au centime
+
+
+def filter_cases(trades):
+    # (instrument, direction, début, fin) : tout, un instrument, une période, un jour tradé, aucun trade
+    first = trades["Entry time"].min().date()
+    last = trades["Entry time"].max().date()
+    instrument = trades["Instrument"].iloc[0]
+    day = trades["Entry time"].iloc[len(trades) // 2].date()
+    return [
+        ("Tous", "Tous", None, None),
+        (instrument, "Long", None, None),
+        ("Tous", "Short", first + pd.Timedelta(days=40), last - pd.Timedelta(days=60)),
+        (instrument, "Tous", day, day),
+        ("Inconnu", "Tous", None, None),
+    ]
+
+
+def check(index, rollup, cube, instrument, direction, start, end):
+    # Liste des écarts pour un filtre
+    errors = []
+    analytics = uv.TradeAnalytics(index.select(instrument, direction, start, end))
+    expected = uv.compute_stats_dict(analytics)
+    got = rollup.range_stats(instrument, direction, start, end)
+    for key, value in expected.items():
+        if not np.isclose(float(value), float(got[key]), atol=TOLERANCE, equal_nan=True):
+            errors.append(f"range_stats[{key}] : {got[key]} au lieu de {value}")
+    if analytics.empty:
+        return errors
+
+    daily, daily_got = analytics.daily, rollup.daily(instrument, direction, start, end)
+    same_daily = len(daily) == len(daily_got) and (daily["Date"].to_numpy() == daily_got["Date"].to_numpy()).all()
+    for col in ["Profit", "Drawdown", "Duration"]:
+        same_daily = same_daily and np.allclose(daily[col], daily_got[col], equal_nan=True)
+    if not same_daily:
+        errors.append("daily : résultat différent")
+
+    timing, timing_got = analytics.timing, cube.timing(instrument, direction, start, end)
+    if not (timing.index.equals(timing_got.index) and np.allclose(timing.to_numpy(), timing_got.to_numpy())):
+        errors.append("timing : résultat différent")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batches", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    raw = load_and_clean_csv(export_path(args.rows, args.seed), on_error=None)
+    order = np.random.default_rng(args.seed).permutation(len(raw))
+    user_dir = tempfile.mkdtemp(prefix="ninja_check_")
+    try:
+        for batch in np.array_split(order, args.batches):
+            trade_store.ingest_trades(user_dir, raw.iloc[batch])
+        rollup = DailyRollup(trade_store.read_aggregate(user_dir, "rollup"))
+        cube = TimingCube(trade_store.read_aggregate(user_dir, "timing"))
+        index = TradeIndex(add_trade_metrics(trade_store.read_trades(user_dir)))
+
+        failures = 0
+        for case in filter_cases(index.trades):
+            errors = check(index, rollup, cube, *case)
+            failures += len(errors)
+            print(f"{'❌' if errors else '✅'} {case}")
+            for error in errors:
+                print(f"     {error}")
+    finally:
+        shutil.rmtree(user_dir, ignore_errors=True)
+
+    if failures:
+        print(f"\n❌ {failures} écart(s) entre agrégats et calcul trade par trade", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Mesure du démarrage à froid : temps d'import et temps du premier rendu.
+
+Chaque mesure tourne dans un processus Python neuf (comme un nouveau worker
+Streamlit). Le script échoue si un budget est dépassé ou si une dépendance
+lourde est importée alors qu'aucune fonctionnalité ne l'utilise.
+
+Usage : python benchmarks/cold_start.py [--rows 50000] [--import-budget 3.0] [--render-budget 5.0]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules importés par app.py (hors authentification)
+APP_MODULES = [
+    "streamlit", "data_cleaner", "trade_store", "trade_filters", "utils_visuals",
+    "journal_store", "daily_rollup", "timing_cube", "target_simulator", "monte_carlo", "market_data",
+    "figure_cache", "perf",
+]
+
+# Dépendances lourdes qui ne doivent être chargées qu'à la demande
+LAZY_MODULES = ["yfinance", "matplotlib", "calplot"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+RENDER_PROBE = """
+import json, time
+start = time.perf_counter()
+import numpy as np
+import pandas as pd
+import utils_visuals as uv
+from trade_filters import TradeIndex
+imported = time.perf_counter()
+
+n = {rows}
+rng = np.random.default_rng(0)
+entry = pd.Timestamp("2020-01-02 09:30") + pd.to_timedelta(np.cumsum(rng.integers(60, 4 * 3600, n)), unit="s")
+df = pd.DataFrame({{
+    "Entry time": entry,
+    "Exit time": entry + pd.to_timedelta(rng.integers(30, 3600, n), unit="s"),
+    "Instrument": rng.choice(["NQ", "ES", "MNQ"], n),
+    "Market pos.": rng.choice(["Long", "Short"], n),
+    "Entry price": rng.uniform(4000, 18000, n).round(2),
+    "Qty": rng.integers(1, 4, n),
+    "Profit": (rng.normal(5, 100, n) / 1.25).round() * 1.25,
+    "MAE": np.abs(rng.normal(0, 50, n)).round(2),
+    "MFE": np.abs(rng.normal(0, 80, n)).round(2),
+    "ETD": np.abs(rng.normal(0, 40, n)).round(2),
+}})
+df["Durée (min)"] = (df["Exit time"] - df["Entry time"]).dt.total_seconds() / 60
+df["Rendement (%)"] = df["Profit"] / (df["Entry price"] * df["Qty"]) * 100
+ready = time.perf_counter()
+
+analytics = uv.TradeAnalytics(TradeIndex(df).select())
+figures = [
+    uv.plot_equity_curve(analytics), uv.plot_drawdown_curve(analytics),
+    uv.plot_daily_pnl(analytics), uv.plot_daily_drawdown(analytics),
+    uv.plot_avg_duration_per_day(analytics), uv.plot_return_vs_duration(analytics),
+    uv.plot_pnl_by_day_of_week(analytics), uv.plot_pnl_by_hour(analytics),
+    uv.plot_asset_distribution(analytics), uv.plot_gain_loss_pie(analytics),
+    uv.plot_histogram_mae_mfe_etd(analytics), uv.plot_scatter_mfe_vs_profit(analytics),
+]
+uv.compute_stats_dict(analytics)
+payload = sum(len(fig.to_json()) for fig in figures)
+done = time.perf_counter()
+
+print(json.dumps({{"import": imported - start, "render": done - ready, "payload_bytes": payload}}))
+"""
+
+
+def run_probe(code):
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--import-budget", type=float, default=3.0, help="secondes")
+    parser.add_argument("--render-budget", type=float, default=5.0, help="secondes")
+    args = parser.parse_args()
+
+    failures = []
+
+    print(f"{'import':<16} {'s':>7}")
+    for module in APP_MODULES:
+        probe = run_probe(IMPORT_PROBE.format(modules=[module], lazy=LAZY_MODULES))
+        print(f"{module:<16} {probe['seconds']:>7.3f}")
+
+    probe = run_probe(IMPORT_PROBE.format(modules=APP_MODULES, lazy=LAZY_MODULES))
+    print(f"{'total app.py':<16} {probe['seconds']:>7.3f}")
+    if probe["seconds"] > args.import_budget:
+        failures.append(f"import {probe['seconds']:.2f}s > budget {args.import_budget}s")
+    if probe["loaded"]:
+        failures.append(f"dépendances chargées au démarrage : {', '.join(probe['loaded'])}")
+
+    render = run_probe(RENDER_PROBE.format(rows=args.rows))
+    print(f"\npremier rendu ({args.rows} trades) : {render['render']:.3f}s, "
+          f"{render['payload_bytes'] / 1e6:.1f} Mo de figures")
+    if render["render"] > args.render_budget:
+        failures.append(f"premier rendu {render['render']:.2f}s > budget {args.render_budget}s")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Suite de benchmarks reproductible : import CSV, historique, statistiques et graphiques.
+
+Sur des exports NinjaTrader synthétiques (benchmarks/synthetic.py, graine fixe), mesure :
+  - load_and_clean_csv        lecture + nettoyage de l'export
+  - update_historical_data    import dans un historique vide, puis ré-import (tout en doublon)
+  - TradeAnalytics            préparation partagée des graphiques
+  - compute_stats_dict        statistiques du tableau de bord
+  - chaque plot_* de utils_visuals (découverts automatiquement)
+
+Chaque mesure est le meilleur temps sur --repeat exécutions. Les résultats sont
+comparés à benchmarks/baseline.json : toute mesure plus lente que la référence
+de plus de --tolerance (et d'au moins --min-delta secondes) est une régression,
+et le script se termine en erreur. --save-baseline enregistre les mesures comme
+nouvelle référence (par taille, les autres tailles sont conservées).
+
+Usage : python benchmarks/suite.py [--sizes 10000 100000] [--repeat 3] [--only motif]
+                                   [--tolerance 0.3] [--min-delta 0.005] [--save-baseline]
+"""
+import argparse
+import gc
+import inspect
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import trade_store
+import utils_visuals as uv
+from data_cleaner import add_trade_metrics, load_and_clean_csv, update_historical_data
+from monte_carlo import run_monte_carlo
+from synthetic import export_path
+from target_simulator import default_grid, simulate_stop_target
+from trade_filters import TradeIndex
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = [10_000, 100_000]  # 1 000 000 : à demander explicitement (--sizes)
+MONTE_CARLO_SIMS = 200  # entrée des graphiques Monte Carlo (seul le graphique est mesuré)
+
+# Arguments des graphiques au-delà du jeu de trades (ctx : contexte de la taille mesurée)
+FIGURE_ARGS = {
+    "plot_presence_timeline": lambda ctx: (ctx["month"],),
+    "plot_presence_histogram": lambda ctx: (ctx["month"],),
+    "plot_rolling_metrics": lambda ctx: (50, "trades"),
+    "plot_equity_vs_market": lambda ctx: (ctx["closes"],),
+}
+# Graphiques qui ne prennent pas un TradeAnalytics : DataFrame brut (les graphiques de
+# présence attendent les trades du mois affiché) ou résultat de simulation
+FIGURE_INPUTS = {
+    "plot_heatmap_mae_vs_mfe": "trades",
+    "plot_presence_timeline": "month_trades",
+    "plot_presence_histogram": "month_trades",
+    "plot_stop_target_heatmap": "stop_target",
+    "plot_monte_carlo_bands": "monte_carlo",
+    "plot_monte_carlo_drawdowns": "monte_carlo",
+}
+
+
+def figure_builders():
+    # Toutes les fonctions plot_* publiques de utils_visuals
+    return {
+        name: func for name, func in inspect.getmembers(uv, inspect.isfunction)
+        if name.startswith("plot_") and func.__module__ == uv.__name__
+    }
+
+
+def best_time(run, setup=None, repeat=3):
+    # Meilleur temps de run(*setup()) ; setup n'est pas chronométré
+    best = float("inf")
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        gc.collect()
+        start = time.perf_counter()
+        run(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _synthetic_closes(dates):
+    # Clôtures de marché fictives sur les jours ouvrés de la période tradée
+    days = pd.bdate_range(dates.min(), dates.max())
+    rng = np.random.default_rng(1)
+    return {"^GSPC": pd.Series(4500 * np.exp(np.cumsum(rng.normal(0, 0.01, len(days)))), index=days)}
+
+
+def build_cases(n_trades, work_dir):
+    # (nom, setup, run) pour une taille ; les données de départ sont préparées ici, hors chrono
+    path = export_path(n_trades)
+    raw = load_and_clean_csv(path, on_error=None)
+
+    store = os.path.join(work_dir, "store")
+    update_historical_data(raw.copy(), store)
+    trades = TradeIndex(add_trade_metrics(trade_store.read_trades(store))).select()
+    analytics = uv.TradeAnalytics(trades)
+    month = trades["Entry time"].iloc[-1]
+    ctx = {
+        "trades": trades,
+        "month": month.to_pydatetime(),
+        "month_trades": trades[trades["Entry time"] >= month.replace(day=1).normalize()],
+        "closes": _synthetic_closes(analytics.date),
+        "stop_target": simulate_stop_target(
+            trades["MAE"].to_numpy(dtype=float), trades["MFE"].to_numpy(dtype=float), analytics.profit,
+            *default_grid(trades["MAE"].to_numpy(dtype=float), trades["MFE"].to_numpy(dtype=float)),
+        ),
+        "monte_carlo": run_monte_carlo(analytics.profit, MONTE_CARLO_SIMS, seed=0),
+    }
+
+    def empty_store():
+        return raw.copy(), tempfile.mkdtemp(dir=work_dir)
+
+    def fresh_analytics():
+        # Nouvelle instance : chaque mesure paie les agrégats qu'elle déclenche
+        return (uv.TradeAnalytics(trades),)
+
+    cases = [
+        ("load_and_clean_csv", None, lambda: load_and_clean_csv(path, on_error=None)),
+        ("update_historical_data", empty_store, update_historical_data),
+        ("update_historical_data (doublons)", lambda: (raw.copy(), store), update_historical_data),
+        ("TradeAnalytics", None, lambda: uv.TradeAnalytics(trades)),
+        ("compute_stats_dict", fresh_analytics, uv.compute_stats_dict),
+    ]
+    for name, func in sorted(figure_builders().items()):
+        params = list(inspect.signature(func).parameters.values())[1:]
+        required = [p for p in params if p.default is inspect.Parameter.empty]
+        if required and name not in FIGURE_ARGS:
+            raise RuntimeError(f"{name} : arguments {[p.name for p in required]} inconnus, ajouter un cas dans FIGURE_ARGS")
+        extra = FIGURE_ARGS[name](ctx) if name in FIGURE_ARGS else ()
+        if name in FIGURE_INPUTS:
+            result = ctx[FIGURE_INPUTS[name]]
+            cases.append((name, None, lambda func=func, result=result, extra=extra: func(result, *extra)))
+        else:
+            cases.append((name, fresh_analytics, lambda data, func=func, extra=extra: func(data, *extra)))
+    return cases
+
+
+def machine_info():
+    import plotly
+
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "plotly": plotly.__version__,
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results, repeat, path=BASELINE_PATH):
+    # Les tailles non mesurées cette fois gardent leur référence
+    baseline = load_baseline(path) or {"results": {}, "repeat": {}}
+    baseline["machine"] = machine_info()
+    for size, timings in results.items():
+        baseline["repeat"][size] = repeat
+        baseline["results"][size] = {name: round(seconds, 6) for name, seconds in timings.items()}
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def compare(results, baseline, tolerance, min_delta):
+    # Affiche mesure / référence et renvoie la liste des régressions
+    regressions = []
+    reference = baseline["results"] if baseline else {}
+    print(f"{'taille':>8}  {'mesure':<36} {'réf. (ms)':>10} {'actuel (ms)':>12} {'ratio':>7}")
+    for size, timings in results.items():
+        for name, seconds in timings.items():
+            ref = reference.get(size, {}).get(name)
+            if ref is None:
+                print(f"{size:>8}  {name:<36} {'-':>10} {seconds * 1000:>12.1f} {'':>7}  (pas de référence)")
+                continue
+            ratio = seconds / ref if ref > 0 else float("inf")
+            regressed = seconds > ref * (1 + tolerance) and seconds - ref > min_delta
+            mark = "  ❌ RÉGRESSION" if regressed else ""
+            print(f"{size:>8}  {name:<36} {ref * 1000:>10.1f} {seconds * 1000:>12.1f} {ratio:>6.2f}x{mark}")
+            if regressed:
+                regressions.append((size, name, ref, seconds))
+        for name in sorted(set(reference.get(size, {})) - set(timings)):
+            print(f"{size:>8}  {name:<36} ⚠️  présent dans la référence mais plus mesuré")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="ne mesurer que les cas dont le nom contient ce motif")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="ralentissement toléré (0.3 = +30 %%)")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="écart minimal en secondes pour conclure")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = {}
+    for n_trades in args.sizes:
+        work_dir = tempfile.mkdtemp(prefix="ninja_bench_")
+        try:
+            timings = {}
+            for name, setup, run in build_cases(n_trades, work_dir):
+                if args.only and args.only not in name:
+                    continue
+                timings[name] = best_time(run, setup, args.repeat)
+                print(f"{n_trades:>8}  {name:<36} {timings[name] * 1000:>10.1f} ms", file=sys.stderr)
+            results[str(n_trades)] = timings
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.save_baseline:
+        save_baseline(results, args.repeat, args.baseline)
+        print(f"Référence enregistrée : {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"⚠️  Aucune référence ({args.baseline}) : lancer avec --save-baseline")
+    elif baseline.get("machine") != machine_info():
+        print(f"⚠️  Référence mesurée sur une autre configuration : {baseline.get('machine')}")
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta)
+    if regressions:
+        print(f"\n❌ {len(regressions)} régression(s) au-delà de +{args.tolerance:.0%} :", file=sys.stderr)
+        for size, name, ref, seconds in regressions:
+            print(f"   {name} ({size} trades) : {ref * 1000:.1f} ms -> {seconds * 1000:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Générateur d'exports NinjaTrader synthétiques (mêmes colonnes et formats que l'export réel).
+
+Les trades sont reproductibles (graine fixe), répartis sur des jours ouvrés entre
+8h et 16h, avec des contrats trimestriels ("NQ 06-24"), un P&L cohérent avec les
+prix et la valeur du point, et des MAE / MFE / ETD compatibles avec le P&L.
+
+Usage : python benchmarks/synthetic.py [--rows 10000 100000 1000000] [--out benchmarks/.data] [--seed 0]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Tailles de référence de la suite de benchmarks
+SIZES = [10_000, 100_000, 1_000_000]
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+
+# Racine -> (valeur du point en $, prix de départ, volatilité d'un trade en points)
+INSTRUMENTS = {
+    "NQ": (20.0, 15000.0, 12.0),
+    "MNQ": (2.0, 15000.0, 12.0),
+    "ES": (50.0, 4500.0, 4.0),
+    "MES": (5.0, 4500.0, 4.0),
+    "CL": (1000.0, 75.0, 0.25),
+}
+COMMISSION = 4.04
+TIME_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+MAX_DAYS = 1260  # ~5 ans de jours ouvrés ; au-delà, plus de trades par jour
+
+EXPORT_COLUMNS = [
+    "Trade number", "Instrument", "Account", "Strategy", "Market pos.", "Qty",
+    "Entry price", "Exit price", "Entry time", "Exit time", "Entry name", "Exit name",
+    "Profit", "Cum. net profit", "Commission", "MAE", "MFE", "ETD", "Bars", "Unnamed: 19",
+]
+
+
+def format_money(amounts):
+    # Format export : "$1,234.50" et "($12.00)" pour les montants négatifs
+    text = np.char.add("$", np.char.mod("%.2f", np.abs(amounts)))
+    # Séparateur des milliers, seulement pour les montants concernés (minoritaires)
+    big = np.abs(amounts) >= 1000
+    text[big] = ["${:,.2f}".format(a) for a in np.abs(amounts[big])]
+    return np.where(amounts < 0, np.char.add(np.char.add("(", text), ")"), text).astype(object)
+
+
+def _contracts(roots, entry):
+    # Contrat trimestriel suivant la date d'entrée : "NQ 06-24"
+    quarter_month = ((entry.month - 1) // 3 + 1) * 3
+    suffix = np.char.add(
+        np.char.mod("%02d", quarter_month.to_numpy()),
+        np.char.mod("-%02d", (entry.year % 100).to_numpy()),
+    )
+    return np.char.add(np.char.add(roots.astype(str), " "), suffix).astype(object)
+
+
+def make_export(n_trades, seed=0, start="2020-01-02"):
+    # DataFrame au format d'un export NinjaTrader brut (tout en texte sauf numéros / prix / qty)
+    rng = np.random.default_rng(seed)
+    n_days = int(min(max(n_trades // 50, 20), MAX_DAYS))
+    days = pd.bdate_range(start, periods=n_days)
+
+    # Heures d'entrée : jours ouvrés, entre 8h et 16h, triées
+    day_index = np.sort(rng.integers(0, n_days, n_trades))
+    seconds = rng.integers(8 * 3600, 16 * 3600, n_trades)
+    order = np.lexsort((seconds, day_index))
+    entry = pd.DatetimeIndex(days[day_index[order]] + pd.to_timedelta(seconds[order], unit="s"))
+    exit_ = entry + pd.to_timedelta(np.ceil(rng.lognormal(5.5, 1.0, n_trades)), unit="s")
+
+    roots = rng.choice(list(INSTRUMENTS), n_trades, p=[0.35, 0.2, 0.25, 0.15, 0.05])
+    point_value, base_price, volatility = (
+        np.array([INSTRUMENTS[r][i] for r in roots]) for i in range(3)
+    )
+    direction = rng.choice(["Long", "Short"], n_trades)
+    sign = np.where(direction == "Long", 1.0, -1.0)
+    qty = rng.integers(1, 4, n_trades)
+
+    # Prix : marche aléatoire lente autour du prix de départ de l'instrument
+    drift = 1 + 0.1 * np.sin(np.arange(n_trades) / max(n_trades / 20, 1))
+    entry_price = np.round(base_price * drift * rng.uniform(0.98, 1.02, n_trades), 2)
+    move = np.round(rng.normal(0.05, 1.0, n_trades) * volatility, 2)
+    exit_price = entry_price + sign * move
+
+    points = qty * point_value
+    profit = np.round(move * points - COMMISSION, 2)
+    mae = np.round(np.maximum(-move, 0) * points + np.abs(rng.normal(0, 0.3, n_trades)) * volatility * points, 2)
+    mfe = np.round(np.maximum(move, 0) * points + np.abs(rng.normal(0, 0.5, n_trades)) * volatility * points, 2)
+    etd = np.round(mfe - (profit + COMMISSION), 2)
+
+    df = pd.DataFrame({
+        "Trade number": np.arange(1, n_trades + 1),
+        "Instrument": _contracts(roots, entry),
+        "Account": "Sim101",
+        "Strategy": "",
+        "Market pos.": direction,
+        "Qty": qty,
+        "Entry price": entry_price,
+        "Exit price": np.round(exit_price, 2),
+        "Entry time": entry.strftime(TIME_FORMAT),
+        "Exit time": exit_.strftime(TIME_FORMAT),
+        "Entry name": "Entry",
+        "Exit name": np.where(profit > 0, "Profit target", "Stop loss"),
+        "Profit": format_money(profit),
+        "Cum. net profit": format_money(np.round(np.cumsum(profit), 2)),
+        "Commission": format_money(np.full(n_trades, COMMISSION)),
+        "MAE": format_money(mae),
+        "MFE": format_money(mfe),
+        "ETD": format_money(etd),
+        "Bars": np.maximum(1, (exit_ - entry).total_seconds().to_numpy() // 60).astype(int),
+        "Unnamed: 19": np.nan,
+    })
+    return df[EXPORT_COLUMNS]
+
+
+def export_path(n_trades, seed=0, data_dir=DATA_DIR):
+    # Export CSV mis en cache sur disque : généré une seule fois par (taille, graine)
+    path = os.path.join(data_dir, f"ninjatrader_{n_trades}_{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        make_export(n_trades, seed).to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--out", default=DATA_DIR)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for n_trades in args.rows:
+        path = export_path(n_trades, args.seed, args.out)
+        print(f"{n_trades:>10} trades -> {path} ({os.path.getsize(path) / 2**20:.1f} Mo)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+from trade_filters import ALL, EMPTY_STATS, day_bounds
+
+# ─────────────────────────────────────────────────────────────────────────
+# Agrégats journaliers persistants (maintenus à l'import par trade_store)
+#
+# Une ligne par (Instrument, Position, jour d'entrée), pour chaque combinaison
+# de filtres du dashboard ("Tous" compris) :
+#   count, wins, losses, profit_sum, profit_sumsq, gross_profit, gross_loss,
+#   profit_min, profit_max, duration_sum, duration_count
+#   eq_max, eq_min, eq_dd : capital cumulé du jour (relatif à l'ouverture) et
+#                           drawdown intrajournalier, pour recomposer le drawdown
+#   cum_* : sommes cumulées des colonnes additives, par combinaison
+#
+# Les statistiques d'une période se lisent alors sans toucher aux trades :
+# colonnes additives en O(1) (différence de sommes cumulées), min / max et
+# drawdown en un parcours vectorisé des seuls jours de la période.
+# ─────────────────────────────────────────────────────────────────────────
+KEY_COLUMNS = ["Instrument", "Direction", "Date"]
+SUM_COLUMNS = [
+    "count", "wins", "losses", "profit_sum", "profit_sumsq",
+    "gross_profit", "gross_loss", "duration_sum", "duration_count",
+]
+PATH_COLUMNS = ["profit_min", "profit_max", "eq_max", "eq_min", "eq_dd"]
+ROLLUP_COLUMNS = KEY_COLUMNS + SUM_COLUMNS + PATH_COLUMNS + [f"cum_{c}" for c in SUM_COLUMNS]
+
+
+def _day_rows(entry, profit, duration):
+    # Agrégats par jour d'un jeu de trades trié par heure d'entrée
+    day = entry.astype("datetime64[D]")
+    new_day = np.concatenate([[True], day[1:] != day[:-1]])
+    starts = np.flatnonzero(new_day)
+    day_id = np.cumsum(new_day) - 1
+
+    # Capital cumulé depuis l'ouverture du jour, après chaque trade
+    cumulative = np.cumsum(profit)
+    equity = cumulative - np.repeat(cumulative[starts] - profit[starts], np.diff(np.append(starts, len(day))))
+    running_max = pd.Series(equity).groupby(day_id).cummax().to_numpy()
+
+    has_duration = ~np.isnan(duration)
+    return {
+        "Date": day[starts],
+        "count": np.add.reduceat(np.ones(len(day)), starts),
+        "wins": np.add.reduceat((profit > 0).astype(float), starts),
+        "losses": np.add.reduceat((profit < 0).astype(float), starts),
+        "profit_sum": np.add.reduceat(profit, starts),
+        "profit_sumsq": np.add.reduceat(profit ** 2, starts),
+        "gross_profit": np.add.reduceat(np.where(profit > 0, profit, 0.0), starts),
+        "gross_loss": np.add.reduceat(np.where(profit < 0, profit, 0.0), starts),
+        "duration_sum": np.add.reduceat(np.where(has_duration, duration, 0.0), starts),
+        "duration_count": np.add.reduceat(has_duration.astype(float), starts),
+        "profit_min": np.minimum.reduceat(profit, starts),
+        "profit_max": np.maximum.reduceat(profit, starts),
+        "eq_max": np.maximum.reduceat(equity, starts),
+        "eq_min": np.minimum.reduceat(equity, starts),
+        "eq_dd": np.maximum.reduceat(running_max - equity, starts),
+    }
+
+
+def rollup_trades(df):
+    # Lignes journalières (sans sommes cumulées) de toutes les combinaisons de filtres
+    df = df[pd.notnull(df["Entry time"])]
+    if df.empty:
+        rows = pd.DataFrame(columns=KEY_COLUMNS + SUM_COLUMNS + PATH_COLUMNS)
+        return rows.astype({col: float for col in SUM_COLUMNS + PATH_COLUMNS})
+    df = df.sort_values("Entry time", kind="stable")
+
+    entry = df["Entry time"].to_numpy()
+    profit = np.nan_to_num(df["Profit"].to_numpy(dtype=float))
+    duration = ((df["Exit time"] - df["Entry time"]).dt.total_seconds() / 60).to_numpy(dtype=float)
+    instruments = df["Instrument"].astype(object).to_numpy()
+    directions = df["Market pos."].astype(object).to_numpy()
+
+    frames = []
+    for instrument in [ALL] + sorted(pd.unique(instruments[pd.notnull(instruments)]).tolist()):
+        for direction in [ALL] + sorted(pd.unique(directions[pd.notnull(directions)]).tolist()):
+            mask = np.ones(len(df), dtype=bool)
+            if instrument != ALL:
+                mask &= instruments == instrument
+            if direction != ALL:
+                mask &= directions == direction
+            if not mask.any():
+                continue
+            rows = pd.DataFrame(_day_rows(entry[mask], profit[mask], duration[mask]))
+            rows.insert(0, "Direction", direction)
+            rows.insert(0, "Instrument", instrument)
+            frames.append(rows)
+    return pd.concat(frames, ignore_index=True)
+
+
+def with_prefix_sums(rows):
+    # Ajoute les sommes cumulées ; les lignes de chaque combinaison doivent être dans
+    # l'ordre des jours (cas des mois concaténés dans l'ordre, voir combine_months)
+    cumulative = rows.groupby(["Instrument", "Direction"], sort=False)[SUM_COLUMNS].cumsum()
+    for col in SUM_COLUMNS:
+        rows[f"cum_{col}"] = cumulative[col].to_numpy(dtype=float)
+    return rows[ROLLUP_COLUMNS]
+
+
+def combine_months(frames):
+    # Lignes mensuelles (stockées par trade_store) -> agrégat complet avec sommes cumulées
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return with_prefix_sums(rollup_trades(pd.DataFrame(columns=["Entry time"])))
+    return with_prefix_sums(pd.concat(frames, ignore_index=True))
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Lecture : statistiques d'une période et séries journalières
+# ─────────────────────────────────────────────────────────────────────────
+class DailyRollup:
+    def __init__(self, rollup):
+        self.groups = {}
+        for (instrument, direction), rows in rollup.groupby(["Instrument", "Direction"], sort=False):
+            arrays = {col: rows[col].to_numpy(dtype=float) for col in rollup.columns if col not in KEY_COLUMNS}
+            arrays["Date"] = rows["Date"].to_numpy().astype("datetime64[D]")
+            self.groups[(instrument, direction)] = arrays
+
+    def _slice(self, instrument, direction, start, end):
+        group = self.groups.get((instrument, direction))
+        if group is None:
+            return None, 0, 0
+        first, last = day_bounds(start, end)
+        lo = group["Date"].searchsorted(first, side="left")
+        hi = group["Date"].searchsorted(last, side="right")
+        return group, lo, hi
+
+    def _path(self, group, lo, hi):
+        # Drawdown (<= 0) le plus bas de chaque jour, le pic étant suivi d'un jour à l'autre
+        # depuis le premier trade de la période
+        day_sum = group["profit_sum"][lo:hi]
+        opening = np.cumsum(day_sum) - day_sum
+        peaks = opening + group["eq_max"][lo:hi]
+        previous_peak = np.concatenate([[-np.inf], np.maximum.accumulate(peaks)[:-1]])
+        return -np.maximum(group["eq_dd"][lo:hi], previous_peak - (opening + group["eq_min"][lo:hi]))
+
+    def _totals(self, group, lo, hi):
+        return {
+            col: group[f"cum_{col}"][hi - 1] - (group[f"cum_{col}"][lo - 1] if lo > 0 else 0.0)
+            for col in SUM_COLUMNS
+        }
+
+    def range_stats(self, instrument=ALL, direction=ALL, start=None, end=None):
+        # Mêmes clés et mêmes arrondis que utils_visuals.compute_stats_dict
+        group, lo, hi = self._slice(instrument, direction, start, end)
+        if group is None or hi <= lo:
+            return dict(EMPTY_STATS)
+
+        totals = self._totals(group, lo, hi)
+        count = totals["count"]
+        mean = totals["profit_sum"] / count
+        variance = (totals["profit_sumsq"] - totals["profit_sum"] * mean) / (count - 1) if count > 1 else np.nan
+        std = np.sqrt(max(variance, 0.0)) if count > 1 else np.nan
+        return {
+            "total_trades": int(count),
+            "winrate": round(totals["wins"] / count * 100, 2),
+            "total_profit": round(totals["profit_sum"], 2),
+            "avg_gain": round(totals["gross_profit"] / totals["wins"], 2) if totals["wins"] else 0,
+            "avg_loss": round(totals["gross_loss"] / totals["losses"], 2) if totals["losses"] else 0,
+            "profit_factor": round(totals["gross_profit"] / abs(totals["gross_loss"]), 2) if totals["losses"] else 0,
+            "max_drawdown": round(self._path(group, lo, hi).min(), 2),
+            "avg_duration": round(totals["duration_sum"] / totals["duration_count"], 2) if totals["duration_count"] else np.nan,
+            "best_trade": group["profit_max"][lo:hi].max(),
+            "worst_trade": group["profit_min"][lo:hi].min(),
+            "sharpe_ratio": round(mean / std, 2) if std != 0 else 0,
+        }
+
+    def daily(self, instrument=ALL, direction=ALL, start=None, end=None):
+        # Même forme que TradeAnalytics.daily : Date, Profit, Drawdown, Duration
+        group, lo, hi = self._slice(instrument, direction, start, end)
+        if group is None or hi <= lo:
+            return pd.DataFrame({
+                "Date": pd.to_datetime([]), "Profit": [], "Drawdown": [], "Duration": [],
+            })
+        with np.errstate(divide="ignore", invalid="ignore"):
+            duration = group["duration_sum"][lo:hi] / group["duration_count"][lo:hi]
+        return pd.DataFrame({
+            "Date": pd.to_datetime(group["Date"][lo:hi]),
+            "Profit": group["profit_sum"][lo:hi],
+            "Drawdown": self._path(group, lo, hi),
+            "Duration": duration,
+        })
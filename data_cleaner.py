@@ -1,6 +1,17 @@
 import pandas as pd
 import numpy as np
 import os
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import trade_store
+
+MONETARY_COLUMNS = ["Profit", "Cum. net profit", "MAE", "MFE", "ETD", "Commission"]
+# Montant nettoyé que la conversion Arrow accepte (elle refuse espaces, "nan", "1_000"…)
+_NUMBER = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
 
 def parse_money(val):
     if pd.isna(val):
@@ -11,47 +22,165 @@ def parse_money(val):
     except:
         return np.nan
 
-def load_and_clean_csv(file):
+def _parse_money_array(values):
+    # Même nettoyage que parse_money, vectorisé (pyarrow.compute) : "(" -> "-", suppression
+    # de ")", "$" et ",", puis conversion en float64. Seules les cellules que la conversion
+    # refuse (vides, texte…) et les cellules non textuelles sont relues par parse_money.
+    retry = np.zeros(len(values), dtype=bool)
     try:
-        df = pd.read_csv(file)
-    except Exception as e:
-        import streamlit as st
-        st.error(f"❌ Erreur lors de la lecture du fichier CSV : {e}")
-        return pd.DataFrame()
+        text = pa.array(values, type=pa.string(), from_pandas=True)
+    except pa.ArrowTypeError:
+        # Texte mêlé à des nombres : les cellules non textuelles passent par parse_money
+        is_text = np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=len(values))
+        text = pa.array(np.where(is_text, values, None), type=pa.string(), from_pandas=True)
+        retry = ~is_text & ~pd.isna(values)
+
+    cleaned = pc.replace_substring(text, "(", "-")
+    for char in (")", "$", ","):
+        cleaned = pc.replace_substring(cleaned, char, "")
+    try:
+        result = pc.cast(cleaned, pa.float64()).to_numpy(zero_copy_only=False, writable=True)
+    except pa.ArrowInvalid:
+        castable = pc.fill_null(pc.match_substring_regex(cleaned, _NUMBER), False)
+        result = pc.cast(pc.if_else(castable, cleaned, None), pa.float64()).to_numpy(zero_copy_only=False, writable=True)
+        retry |= pc.and_(pc.invert(castable), pc.is_valid(text)).to_numpy(zero_copy_only=False)
+
+    if retry.any():
+        result[retry] = [parse_money(v) for v in values[retry]]
+    return result
 
+def parse_money_columns(df, columns=MONETARY_COLUMNS):
+    # Version vectorisée de parse_money : toutes les colonnes texte sont converties
+    # en une seule passe. Cellules vides ou illisibles -> NaN, comme parse_money.
+    columns = [col for col in columns if col in df.columns]
+    text_columns = []
+    for col in columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype(float)
+        else:
+            text_columns.append(col)
+
+    if not text_columns:
+        return df
+
+    values = df[text_columns].to_numpy(dtype=object).ravel(order="F")
+    result = _parse_money_array(values).reshape((len(df), len(text_columns)), order="F")
+    for i, col in enumerate(text_columns):
+        df[col] = result[:, i]
+    return df
+
+# Taille des paquets de l'import en flux : borne la mémoire utilisée par un import
+IMPORT_CHUNK_ROWS = 50_000
+
+def _report_read_error(e):
+    import streamlit as st
+    st.error(f"❌ Erreur lors de la lecture du fichier CSV : {e}")
+
+def clean_trades(df):
     # Suppression de colonnes inutiles
     df = df.drop(columns=["Unnamed: 19"], errors="ignore")
 
     # Conversion des colonnes monétaires
-    monetary_columns = ["Profit", "Cum. net profit", "MAE", "MFE", "ETD", "Commission"]
-    for col in monetary_columns:
-        if col in df.columns:
-            df[col] = df[col].apply(parse_money)
+    df = parse_money_columns(df, MONETARY_COLUMNS)
 
     # Conversion des dates
     df["Entry time"] = pd.to_datetime(df["Entry time"], errors="coerce")
     df["Exit time"] = pd.to_datetime(df["Exit time"], errors="coerce")
 
+    # Instrument racine ("NQ") ; le contrat complet reste dans "Contract"
+    if "Instrument" in df.columns:
+        df = trade_store.split_instrument(df)
+
     # ID unique pour éviter les doublons
-    if "Trade number" in df.columns:
-        df["trade_id"] = df["Trade number"].astype(str) + "_" + df["Entry time"].astype(str)
-    else:
-        df["trade_id"] = df.index.astype(str) + "_" + df["Entry time"].astype(str)
+    df["trade_id"] = trade_store.trade_ids(df)
 
     return df
 
-def update_historical_data(df_new, historical_path):
-    if os.path.exists(historical_path):
-        df_hist = pd.read_csv(historical_path, parse_dates=["Entry time", "Exit time"])
-        if "Trade number" in df_hist.columns:
-            df_hist["trade_id"] = df_hist["Trade number"].astype(str) + "_" + df_hist["Entry time"].astype(str)
-        else:
-            df_hist["trade_id"] = df_hist.index.astype(str) + "_" + df_hist["Entry time"].astype(str)
-
-        df_to_add = df_new[~df_new["trade_id"].isin(df_hist["trade_id"])]
-        df_updated = pd.concat([df_hist, df_to_add], ignore_index=True).drop(columns=["trade_id"], errors="ignore")
-        df_updated.to_csv(historical_path, index=False)
-        return df_updated, len(df_to_add)
-    else:
-        df_new.drop(columns=["trade_id"], errors="ignore").to_csv(historical_path, index=False)
-        return df_new.drop(columns=["trade_id"], errors="ignore"), len(df_new)
+def add_trade_metrics(df):
+    # Colonnes dérivées utilisées par les graphiques et la table des trades
+    df["Durée (min)"] = (df["Exit time"] - df["Entry time"]).dt.total_seconds() / 60
+    df["Rendement (%)"] = (df["Profit"] / (df["Entry price"] * df["Qty"])) * 100
+    return df
+
+def load_and_clean_csv(file, on_error=_report_read_error):
+    # on_error=None : l'erreur de lecture est propagée à l'appelant
+    try:
+        df = pd.read_csv(file)
+    except Exception as e:
+        if on_error is None:
+            raise
+        on_error(e)
+        return pd.DataFrame()
+
+    return clean_trades(df)
+
+def iter_clean_csv(file, chunksize=IMPORT_CHUNK_ROWS):
+    # Lecture en flux : paquets de chunksize lignes, nettoyés un par un.
+    # L'index continue d'un paquet à l'autre, les trade_id sont donc ceux d'une lecture complète.
+    for chunk in pd.read_csv(file, chunksize=chunksize):
+        yield clean_trades(chunk)
+
+def update_historical_data(df_new, user_dir):
+    # Import incrémental en une transaction : dédoublonnage contre l'index des trade_id
+    # des mois touchés, écriture des seuls nouveaux trades, validation atomique.
+    if df_new.empty:
+        return df_new, 0
+
+    df_to_add = trade_store.ingest_trades(user_dir, df_new)
+    return df_to_add.drop(columns=["trade_id"]), len(df_to_add)
+
+def import_csv_in_batches(file, user_dir, chunksize=IMPORT_CHUNK_ROWS, on_progress=None):
+    # Import en flux d'un gros export : chaque paquet est nettoyé, dédoublonné et validé
+    # dans sa propre transaction. La mémoire reste bornée par la taille d'un paquet, et
+    # un import interrompu peut être relancé (les trades déjà validés sont ignorés).
+    # on_progress(fraction) est appelé après chaque paquet.
+    # Renvoie (trades ajoutés, erreur ou None) : en cas d'erreur, les paquets validés
+    # avant elle restent dans l'historique.
+    total_size = getattr(file, "size", None)
+    new_count = 0
+    try:
+        for df_chunk in iter_clean_csv(file, chunksize):
+            new_count += len(trade_store.ingest_trades(user_dir, df_chunk))
+            if on_progress is not None and total_size:
+                on_progress(min(file.tell() / total_size, 1.0))
+    except Exception as e:
+        return new_count, e
+    if on_progress is not None:
+        on_progress(1.0)
+    return new_count, None
+
+def _clean_csv_bytes(data):
+    # Exécuté dans un processus du pool : lecture + nettoyage d'un fichier complet
+    return load_and_clean_csv(io.BytesIO(data), on_error=None)
+
+def import_csv_files(files, user_dir, max_workers=None):
+    # Import de plusieurs exports : lecture et nettoyage en parallèle (un fichier par processus),
+    # puis un seul dédoublonnage inter-fichiers et une seule validation dans l'historique.
+    # files : liste de (nom, contenu en octets). Les résultats sont repérés par la position
+    # dans files (deux fichiers de même nom restent distincts) : renvoie la liste des trades
+    # ajoutés par fichier et {position: erreur}.
+    # Un trade présent dans plusieurs fichiers est compté pour le premier de la liste.
+    max_workers = max_workers or min(len(files), os.cpu_count() or 1)
+    frames, errors = {}, {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_clean_csv_bytes, data) for _, data in files]
+        for position, future in enumerate(futures):
+            try:
+                frames[position] = future.result()
+            except Exception as e:
+                errors[position] = e
+
+    added = [0] * len(files)
+    positions = sorted(frames)
+    if not positions:
+        return added, errors
+
+    # Origine de chaque ligne : les lignes retenues par ingest_trades gardent leur position
+    source = np.repeat(positions, [len(frames[position]) for position in positions])
+    df_all = pd.concat([frames[position] for position in positions], ignore_index=True)
+    if df_all.empty:
+        return added, errors
+
+    df_added = trade_store.ingest_trades(user_dir, df_all)
+    counts = np.bincount(source[df_added.index.to_numpy()], minlength=len(files))
+    return counts.tolist(), errors
@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from plotly.basedatatypes import BasePlotlyType
+
+# ─────────────────────────────────────────────────────────────────────────
+# Cache LRU des figures Plotly entre reruns
+#
+# Clé : (utilisateur, version du store, filtres, graphique, paramètres). Un rerun
+# déclenché par un widget sans rapport (journal, navigation…) retrouve les mêmes
+# clés et réutilise les figures au lieu de refaire le travail DataFrame + Plotly.
+#
+# Les figures sont partagées entre sessions (comme l'index de load_history) :
+# elles ne doivent jamais être modifiées après leur construction.
+# Mémoire : taille estimée des tableaux de chaque figure, éviction des moins
+# récemment utilisées au-delà de max_bytes. Les figures d'une ancienne version
+# du store ne sont plus demandées et sortent d'elles-mêmes par LRU.
+# Une figure plus grosse que max_bytes n'est pas mise en cache (comptée dans
+# "oversize") : les courbes et nuages de points étant bornés à MAX_PLOT_POINTS
+# (utils_visuals), les figures du tableau de bord restent sous 25 Mo estimés à
+# 1M trades et tiennent sous le plafond par défaut.
+# ─────────────────────────────────────────────────────────────────────────
+FIGURE_CACHE_MB = int(os.environ.get("FIGURE_CACHE_MB", "256"))
+FIGURE_OVERHEAD = 16 * 1024  # layout, objets Plotly : forfait par figure
+_OBJECT_SAMPLE = 100
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype != object or value.size == 0:
+            return value.nbytes
+        # Tableaux d'objets (dates, textes du survol) : taille moyenne sur un échantillon
+        sample = value.ravel()[:_OBJECT_SAMPLE]
+        return value.nbytes + value.size * sum(sys.getsizeof(v) for v in sample) // len(sample)
+    if isinstance(value, BasePlotlyType):
+        return sum(_nbytes(value[key]) for key in value)
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, str):
+        return len(value)
+    return 0
+
+
+def figure_nbytes(fig):
+    # Estimation sans copie : les propriétés lues partagent la mémoire de la figure
+    return FIGURE_OVERHEAD + sum(_nbytes(trace) for trace in fig.data)
+
+
+class FigureCache:
+    def __init__(self, max_bytes=FIGURE_CACHE_MB * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = self.oversize = 0
+        self._entries = OrderedDict()  # clé -> (figure, taille estimée)
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        # Construction hors verrou : deux sessions peuvent construire la même figure,
+        # la dernière remplace l'autre
+        fig = build()
+        size = figure_nbytes(fig)
+        with self._lock:
+            self.misses += 1
+            if size > self.max_bytes:
+                self.oversize += 1
+                return fig
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            self._entries[key] = (fig, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "figures": len(self._entries),
+                "mb": round(self.nbytes / 2**20, 1),
+                "max_mb": round(self.max_bytes / 2**20, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "oversize": self.oversize,
+            }
@@ -0,0 +1,29 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+# ─────────────────────────────────────────────────────────────────────────
+# Verrou d'écriture par dossier (fichier .lock, flock exclusif)
+#
+# Partagé par le store des trades (un dossier par utilisateur) et le cache
+# des données de marché (un dossier par fournisseur, commun à tous).
+# ─────────────────────────────────────────────────────────────────────────
+LOCK_FILE = ".lock"
+
+
+@contextmanager
+def dir_lock(directory):
+    # Sérialise les écritures concurrentes dans directory (onglets, sessions, utilisateurs)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import uuid
+from contextlib import closing
+
+from perf import timed
+
+# ─────────────────────────────────────────────────────────────────────────
+# Journal de séance : base SQLite par utilisateur, une ligne par jour
+#
+#   data/<user>/journal.sqlite3
+#       notes(day TEXT PRIMARY KEY "YYYY-MM-DD", text TEXT, images TEXT JSON)
+#
+# Une sauvegarde ne touche que la note du jour (UPSERT) ; SQLite garantit
+# qu'une écriture interrompue ne corrompt pas les autres notes.
+# ─────────────────────────────────────────────────────────────────────────
+JOURNAL_DB = "journal.sqlite3"
+LEGACY_JSON = "journal_notes.json"
+
+# Captures : stockage adressé par contenu + miniatures pré-générées
+#   data/<user>/journal_images/<sha256>.<ext>
+#   data/<user>/journal_images/thumbs/<clé>.jpg
+IMAGE_DIR = "journal_images"
+THUMB_DIR = "thumbs"
+THUMB_SIZE = (320, 320)
+_CONTENT_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    day    TEXT PRIMARY KEY,
+    text   TEXT NOT NULL DEFAULT '',
+    images TEXT NOT NULL DEFAULT '[]'
+)
+"""
+
+
+def _connect(user_dir):
+    conn = sqlite3.connect(os.path.join(user_dir, JOURNAL_DB), timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def _note(row):
+    return {"day": row["day"], "text": row["text"], "images": json.loads(row["images"])}
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Migration de l'ancien journal_notes.json
+# ─────────────────────────────────────────────────────────────────────────
+@timed
+def migrate_json_journal(user_dir):
+    json_path = os.path.join(user_dir, LEGACY_JSON)
+    if not os.path.exists(json_path):
+        return 0
+
+    with open(json_path, "r") as f:
+        journal = json.load(f)
+
+    rows = []
+    for key, note in journal.items():
+        # Ancien format : note = texte seul ; clés "2024-05-01 00:00:00"
+        if isinstance(note, str):
+            note = {"text": note, "images": []}
+        rows.append((key.split(" ")[0], note.get("text", ""), json.dumps(note.get("images", []))))
+
+    with closing(_connect(user_dir)) as conn, conn:
+        # Les notes déjà présentes en base (plus récentes) ne sont pas écrasées
+        conn.executemany("INSERT OR IGNORE INTO notes (day, text, images) VALUES (?, ?, ?)", rows)
+    try:
+        os.replace(json_path, json_path + ".migrated")
+    except FileNotFoundError:  # migré en parallèle par une autre session
+        pass
+    return len(rows)
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Lecture / écriture
+# ─────────────────────────────────────────────────────────────────────────
+@timed
+def get_note(user_dir, day):
+    with closing(_connect(user_dir)) as conn:
+        row = conn.execute("SELECT * FROM notes WHERE day = ?", (day,)).fetchone()
+    return _note(row) if row else None
+
+
+@timed
+def upsert_note(user_dir, day, text, images):
+    with closing(_connect(user_dir)) as conn, conn:
+        conn.execute(
+            "INSERT INTO notes (day, text, images) VALUES (?, ?, ?) "
+            "ON CONFLICT(day) DO UPDATE SET text = excluded.text, images = excluded.images",
+            (day, text, json.dumps(images)),
+        )
+
+
+@timed
+def list_days(user_dir):
+    with closing(_connect(user_dir)) as conn:
+        return [row["day"] for row in conn.execute("SELECT day FROM notes ORDER BY day")]
+
+
+@timed
+def list_notes(user_dir, start=None, end=None, newest_first=False):
+    # Notes dont le jour est dans [start, end] (bornes "YYYY-MM-DD" incluses, optionnelles)
+    query = "SELECT * FROM notes WHERE day >= ? AND day <= ? ORDER BY day"
+    if newest_first:
+        query += " DESC"
+    with closing(_connect(user_dir)) as conn:
+        rows = conn.execute(query, (start or "0000-01-01", end or "9999-12-31")).fetchall()
+    return [_note(row) for row in rows]
+
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Captures d'écran
+# ─────────────────────────────────────────────────────────────────────────
+def image_dir(user_dir):
+    return os.path.join(user_dir, IMAGE_DIR)
+
+
+@timed
+def store_image(user_dir, data, filename):
+    # Une capture identique déjà importée (même contenu) n'est pas réécrite.
+    # Image illisible (corrompue, format non supporté) : OSError de PIL propagée
+    # (PIL.UnidentifiedImageError en hérite), et la capture n'est pas conservée.
+    digest = hashlib.sha256(data).hexdigest()
+    ext = os.path.splitext(filename)[1].lower() or ".png"
+    path = os.path.join(image_dir(user_dir), f"{digest}{ext}")
+
+    created = not os.path.exists(path)
+    if created:
+        os.makedirs(image_dir(user_dir), exist_ok=True)
+        tmp = f"{path}.tmp-{uuid.uuid4().hex}"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    try:
+        thumbnail_path(user_dir, path)
+    except OSError:
+        if created:
+            os.remove(path)
+        raise
+    return path
+
+
+@timed
+def thumbnail_path(user_dir, path):
+    # Miniature JPEG de la capture, générée au premier besoin puis réutilisée
+    # (OSError si PIL ne peut pas lire la capture).
+    # Anciennes captures (nommées "<jour>_<nom>") : clé dérivée du chemin et de la date de modification.
+    name = os.path.splitext(os.path.basename(path))[0]
+    if not _CONTENT_NAME.match(name):
+        name = hashlib.sha256(f"{path}:{os.path.getmtime(path)}".encode()).hexdigest()
+    thumb = os.path.join(image_dir(user_dir), THUMB_DIR, f"{name}.jpg")
+
+    if not os.path.exists(thumb):
+        from PIL import Image
+
+        os.makedirs(os.path.dirname(thumb), exist_ok=True)
+        tmp = f"{thumb}.tmp-{uuid.uuid4().hex}"
+        try:
+            with Image.open(path) as img:
+                img.thumbnail(THUMB_SIZE)
+                img.convert("RGB").save(tmp, "JPEG", quality=80)
+            os.replace(tmp, thumb)
+        except Exception:
+            # Miniature partielle (save interrompu) : pas de fichier temporaire orphelin
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    return thumb
@@ -0,0 +1,211 @@
+import json
+import os
+import time
+import uuid
+from datetime import timedelta
+
+import pandas as pd
+
+from file_lock import dir_lock
+
+# ─────────────────────────────────────────────────────────────────────────
+# Données de marché : barres OHLC journalières
+#
+# Un fournisseur (provider) expose fetch(symbol, start, end) -> DataFrame
+#   Date, Open, High, Low, Close, Volume   (dates incluses)
+# Il est enveloppé par MarketDataCache, un cache disque par symbole :
+#
+#   data/.market_cache/<provider>/
+#       <symbol>.parquet   barres déjà récupérées (fusionnées, triées par Date)
+#       <symbol>.json      plages couvertes : [[début, fin, récupéré_le, vide], ...]
+#       .lock              verrou des écritures (partagé par tous les utilisateurs)
+#
+# Seules les parties manquantes d'une plage demandée sont récupérées. Une
+# plage reste valide sans limite si elle se termine avant le jour de sa
+# récupération (barres closes) ; sinon elle expire après ttl.
+# Une plage vide (aucune barre) qui touche la séance en cours expire après
+# empty_ttl : yfinance renvoie aussi un résultat vide en cas d'erreur réseau, à
+# ne pas garder comme une absence de données. Une plage vide passée (week-end,
+# jour férié, symbole pas encore coté) expire après ttl : une erreur réseau y est
+# corrigée dans la journée, sans nouvelle requête toutes les empty_ttl.
+# ─────────────────────────────────────────────────────────────────────────
+CACHE_DIR = os.path.join("data", ".market_cache")
+DEFAULT_TTL = timedelta(hours=12)
+EMPTY_TTL = timedelta(minutes=15)
+BAR_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume"]
+
+# Racine d'instrument NinjaTrader -> symbole du fournisseur (contrat continu)
+INSTRUMENT_SYMBOLS = {
+    "NQ": "NQ=F", "MNQ": "NQ=F",
+    "ES": "ES=F", "MES": "ES=F",
+    "YM": "YM=F", "MYM": "YM=F",
+    "RTY": "RTY=F", "M2K": "RTY=F",
+    "CL": "CL=F", "MCL": "CL=F",
+    "GC": "GC=F", "MGC": "GC=F",
+}
+BENCHMARK_SYMBOL = "^GSPC"
+
+
+def _empty_bars():
+    return pd.DataFrame({col: pd.Series(dtype="datetime64[ns]" if col == "Date" else float) for col in BAR_COLUMNS})
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Fournisseurs
+# ─────────────────────────────────────────────────────────────────────────
+class LocalFileProvider:
+    # Fichiers <dossier>/<symbole>.csv ou .parquet (colonnes BAR_COLUMNS),
+    # pour travailler hors ligne ou figer des données de référence
+    name = "local"
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get("MARKET_DATA_DIR", "market_data")
+
+    def fetch(self, symbol, start, end):
+        for ext, read in ((".parquet", pd.read_parquet), (".csv", pd.read_csv)):
+            path = os.path.join(self.root, f"{symbol}{ext}")
+            if os.path.exists(path):
+                bars = read(path)
+                break
+        else:
+            return _empty_bars()
+
+        bars["Date"] = pd.to_datetime(bars["Date"]).dt.tz_localize(None).dt.normalize()
+        in_range = (bars["Date"] >= pd.Timestamp(start)) & (bars["Date"] <= pd.Timestamp(end))
+        return bars.loc[in_range, BAR_COLUMNS].reset_index(drop=True)
+
+
+class YahooProvider:
+    # yfinance n'est importé qu'au premier appel réseau
+    name = "yahoo"
+
+    def fetch(self, symbol, start, end):
+        import yfinance as yf
+
+        bars = yf.download(
+            symbol,
+            start=pd.Timestamp(start).strftime("%Y-%m-%d"),
+            end=(pd.Timestamp(end) + timedelta(days=1)).strftime("%Y-%m-%d"),
+            interval="1d",
+            auto_adjust=False,
+            progress=False,
+            multi_level_index=False,
+        )
+        if bars.empty:
+            return _empty_bars()
+        bars = bars.reset_index()
+        bars["Date"] = pd.to_datetime(bars["Date"]).dt.tz_localize(None).dt.normalize()
+        return bars[BAR_COLUMNS]
+
+
+PROVIDERS = {
+    LocalFileProvider.name: LocalFileProvider,
+    YahooProvider.name: YahooProvider,
+}
+
+
+def get_provider(name=None):
+    return PROVIDERS[name or os.environ.get("MARKET_DATA_PROVIDER", YahooProvider.name)]()
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Cache disque
+# ─────────────────────────────────────────────────────────────────────────
+def _day(value):
+    return pd.Timestamp(value).normalize()
+
+
+def _missing_spans(start, end, spans):
+    # Sous-plages de [start, end] non couvertes par spans (triées, dates incluses)
+    missing, cursor = [], start
+    for span_start, span_end in sorted(spans):
+        if span_end < cursor:
+            continue
+        if span_start > end:
+            break
+        if span_start > cursor:
+            missing.append((cursor, span_start - timedelta(days=1)))
+        cursor = max(cursor, span_end + timedelta(days=1))
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+
+class MarketDataCache:
+    def __init__(self, provider=None, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, empty_ttl=EMPTY_TTL):
+        self.provider = provider or get_provider()
+        self.cache_dir = os.path.join(cache_dir, self.provider.name)
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        self.fetches = 0  # appels au fournisseur (pour vérifier que le cache sert bien)
+
+    def _paths(self, symbol):
+        safe = symbol.replace("/", "_")
+        return os.path.join(self.cache_dir, f"{safe}.parquet"), os.path.join(self.cache_dir, f"{safe}.json")
+
+    def _load(self, symbol):
+        bars_path, spans_path = self._paths(symbol)
+        if not os.path.exists(spans_path):
+            return _empty_bars(), []
+        with open(spans_path, "r") as f:
+            spans = json.load(f)
+        bars = pd.read_parquet(bars_path) if os.path.exists(bars_path) else _empty_bars()
+        return bars, spans
+
+    def _is_valid(self, span, now):
+        # Plages écrites avant l'indicateur "vide" : [début, fin, récupéré_le]
+        _, end, fetched_at, *empty = span
+        fetched = pd.Timestamp(fetched_at, unit="s")
+        past = _day(end) < fetched.normalize()
+        if empty and empty[0]:
+            return now - fetched < (self.ttl if past else self.empty_ttl)
+        return past or now - fetched < self.ttl
+
+    def get_bars(self, symbol, start, end):
+        start, end = _day(start), _day(end)
+        bars, spans = self._load(symbol)
+        now = pd.Timestamp(time.time(), unit="s")
+        valid = [(_day(span[0]), _day(span[1])) for span in spans if self._is_valid(span, now)]
+        missing = _missing_spans(start, end, valid)
+
+        if missing:
+            # Récupération des seules plages manquantes, puis fusion sous verrou
+            fetched = [self.provider.fetch(symbol, a, b) for a, b in missing]
+            self.fetches += len(missing)
+            with dir_lock(self.cache_dir):
+                bars, spans = self._load(symbol)
+                frames = [f for f in [bars] + fetched if not f.empty]
+                if frames:
+                    bars = pd.concat(frames, ignore_index=True)
+                    bars = bars.drop_duplicates(subset="Date", keep="last").sort_values("Date", ignore_index=True)
+                # Les plages expirées sont remplacées par celles qui viennent d'être récupérées
+                spans = [s for s in spans if self._is_valid(s, now)]
+                spans += [
+                    [a.isoformat(), b.isoformat(), now.timestamp(), f.empty] for (a, b), f in zip(missing, fetched)
+                ]
+                self._save(symbol, bars, spans)
+
+        in_range = (bars["Date"] >= start) & (bars["Date"] <= end)
+        return bars.loc[in_range].reset_index(drop=True)
+
+    def _save(self, symbol, bars, spans):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        bars_path, spans_path = self._paths(symbol)
+        # Barres d'abord : des plages ne référencent jamais des barres absentes
+        tmp = f"{bars_path}.tmp-{uuid.uuid4().hex}"
+        bars.to_parquet(tmp, index=False)
+        os.replace(tmp, bars_path)
+        tmp = f"{spans_path}.tmp-{uuid.uuid4().hex}"
+        with open(tmp, "w") as f:
+            json.dump(spans, f)
+        os.replace(tmp, spans_path)
+
+
+def closes(cache, symbols, start, end):
+    # {symbole: Series Close indexée par Date} ; symboles sans données ignorés
+    result = {}
+    for symbol in dict.fromkeys(symbols):
+        bars = cache.get_bars(symbol, start, end)
+        if not bars.empty:
+            result[symbol] = bars.set_index("Date")["Close"]
+    return result
@@ -0,0 +1,88 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ─────────────────────────────────────────────────────────────────────────
+# Monte Carlo sur la séquence des P&L de trades
+#
+#   "bootstrap"   : tirage avec remise de n trades parmi les n historiques
+#   "permutation" : mêmes trades dans un ordre aléatoire (P&L final inchangé,
+#                   seul le chemin — donc le drawdown — varie)
+#
+# Les simulations sont faites par lots (matrice lot × n trades, mémoire bornée
+# par MAX_BATCH_CELLS). Chaque lot a son propre générateur, dérivé de la graine
+# par SeedSequence.spawn : les résultats ne dépendent ni du nombre de processus
+# ni de l'ordre d'exécution. Un lot ne renvoie que le capital aux points de
+# contrôle, le max drawdown, le capital minimum et le P&L final de chaque tirage.
+#
+# Le capital part de 0 : drawdown et ruine sont mesurés depuis le capital initial.
+# ─────────────────────────────────────────────────────────────────────────
+METHODS = ("bootstrap", "permutation")
+MAX_BATCH_CELLS = 4_000_000
+PARALLEL_MIN_CELLS = 200_000_000
+BAND_POINTS = 200
+QUANTILES = (5, 25, 50, 75, 95)
+
+
+def _checkpoints(n, points=BAND_POINTS):
+    # Indices (0 = après le 1er trade) où les bandes de capital sont mesurées
+    return np.unique(np.linspace(0, n - 1, min(n, points)).astype(int))
+
+
+def _simulate_batch(profit, method, size, seed, checkpoints):
+    rng = np.random.default_rng(seed)
+    if method == "bootstrap":
+        paths = profit[rng.integers(0, len(profit), size=(size, len(profit)))]
+    else:
+        paths = rng.permuted(np.broadcast_to(profit, (size, len(profit))), axis=1)
+
+    equity = np.cumsum(paths, axis=1)
+    peaks = np.maximum(np.maximum.accumulate(equity, axis=1), 0.0)
+    return {
+        "equity": equity[:, checkpoints],
+        "max_drawdown": (equity - peaks).min(axis=1),
+        "min_equity": np.minimum(equity.min(axis=1), 0.0),
+        "final_pnl": equity[:, -1].copy(),  # copie : une vue garderait toute la matrice en mémoire
+    }
+
+
+def run_monte_carlo(profit, n_sims=10_000, method="bootstrap", seed=None, ruin_loss=None, workers=None):
+    # profit : P&L des trades dans l'ordre historique. ruin_loss : perte (> 0) considérée
+    # comme la ruine (capital du compte) ; risque de ruine = part des tirages qui l'atteignent.
+    if method not in METHODS:
+        raise ValueError(f"Méthode inconnue : {method}")
+    profit = np.asarray(profit, dtype=float)
+    profit = profit[~np.isnan(profit)]
+    n = len(profit)
+    if n == 0:
+        return None
+
+    checkpoints = _checkpoints(n)
+    batch = max(1, min(n_sims, MAX_BATCH_CELLS // n))
+    sizes = [min(batch, n_sims - start) for start in range(0, n_sims, batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(profit, method, size, s, checkpoints) for size, s in zip(sizes, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1 and n_sims * n >= PARALLEL_MIN_CELLS:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_simulate_batch, *job) for job in jobs]
+            batches = [future.result() for future in futures]
+    else:
+        batches = [_simulate_batch(*job) for job in jobs]
+
+    merged = {key: np.concatenate([b[key] for b in batches]) for key in batches[0]}
+    historical = np.cumsum(profit)
+    historical_peaks = np.maximum(np.maximum.accumulate(historical), 0.0)
+    return {
+        "method": method,
+        "n_sims": n_sims,
+        "trade_number": checkpoints + 1,
+        "bands": {q: np.percentile(merged["equity"], q, axis=0) for q in QUANTILES},
+        "historical_equity": historical[checkpoints],
+        "max_drawdown": merged["max_drawdown"],
+        "historical_max_drawdown": (historical - historical_peaks).min(),
+        "final_pnl": merged["final_pnl"],
+        "risk_of_ruin": (merged["min_equity"] <= -ruin_loss).mean() if ruin_loss else None,
+    }
@@ -0,0 +1,211 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+
+# ─────────────────────────────────────────────────────────────────────────
+# Instrumentation des reruns : durée, lignes traitées et mémoire par étape
+#
+#   start_rerun(user)      ouvre l'enregistrement du rerun (thread courant)
+#   with stage("nom"):     mesure un bloc ; info["rows"] = ... pour les lignes
+#   @timed                 mesure chaque appel d'une fonction (plot_*, stats…)
+#   finish_rerun()         ajoute une ligne JSON au journal et renvoie le rerun
+#   with fragment("nom", user):  zone st.fragment : étape d'un rerun complet, ou
+#                          rerun à part entière quand la zone est relancée seule
+#
+# Sans rerun ouvert (CLI, benchmarks), stage / timed ne mesurent rien.
+# Mémoire : RSS du processus (partagé entre sessions Streamlit), avant / après.
+# Journal : une ligne JSON par rerun, agrégable entre utilisateurs. Au-delà de
+# PERF_LOG_MAX_MB, le fichier devient <journal>.1 (l'ancien .1 est supprimé) :
+# deux fichiers au plus sur disque, et read_log ne lit que la fin du journal.
+# ─────────────────────────────────────────────────────────────────────────
+LOG_PATH = os.environ.get("PERF_LOG_PATH", os.path.join("data", ".perf", "reruns.jsonl"))
+LOG_ENABLED = os.environ.get("PERF_LOG", "1") != "0"
+LOG_MAX_BYTES = int(float(os.environ.get("PERF_LOG_MAX_MB", "16")) * 2**20)
+_TAIL_BLOCK = 64 * 1024
+
+_recorder = contextvars.ContextVar("perf_recorder", default=None)
+_log_lock = threading.Lock()
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource  # hors Linux : pic de mémoire plutôt que RSS courant
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _rows(value):
+    if hasattr(value, "trades"):  # TradeAnalytics
+        return len(value.trades)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+
+class Recorder:
+    def __init__(self, user, fragment=None):
+        self.user = user
+        self.fragment = fragment
+        self.stages = []
+        self.started = time.time()
+        self.clock = time.perf_counter()
+        self.rss_start = rss_mb()
+
+    def add(self, name, seconds, rows, rss_before, rss_after):
+        self.stages.append({
+            "stage": name,
+            "ms": round(seconds * 1000, 2),
+            "rows": rows,
+            "rss_mb": round(rss_after, 1),
+            "rss_delta_mb": round(rss_after - rss_before, 1),
+        })
+
+    def record(self):
+        return {
+            "ts": round(self.started, 3),
+            "user": self.user,
+            "fragment": self.fragment,
+            "total_ms": round((time.perf_counter() - self.clock) * 1000, 2),
+            "rss_start_mb": round(self.rss_start, 1),
+            "rss_end_mb": round(rss_mb(), 1),
+            "stages": self.stages,
+        }
+
+
+def start_rerun(user, fragment=None):
+    recorder = Recorder(user, fragment)
+    _recorder.set(recorder)
+    return recorder
+
+
+@contextmanager
+def stage(name, rows=None):
+    recorder = _recorder.get()
+    info = {"rows": rows}
+    if recorder is None:
+        yield info
+        return
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        recorder.add(name, time.perf_counter() - start, info["rows"], rss_before, rss_mb())
+
+
+def timed(func):
+    # Mesure chaque appel ; lignes = taille du premier argument (trades analysés)
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _recorder.get() is None:
+            return func(*args, **kwargs)
+        with stage(func.__name__, _rows(args[0]) if args else None):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _fragment_only_run():
+    # Rerun limité à des zones st.fragment (widget d'un fragment) : la page n'est pas réexécutée
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return False
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+
+@contextmanager
+def fragment(name, user):
+    # Pendant un rerun complet, le fragment est une étape ; relancé seul (widget du
+    # fragment), il est journalisé comme un rerun. Un rerun complet interrompu par
+    # st.stop() / st.rerun() n'atteint pas finish_rerun : son enregistrement reste
+    # ouvert dans le thread, d'où la vérification du type de rerun plutôt que du
+    # seul enregistrement courant.
+    if _recorder.get() is not None and not _fragment_only_run():
+        with stage(name) as info:
+            yield info
+        return
+    start_rerun(user, fragment=name)
+    try:
+        with stage(name) as info:
+            yield info
+    finally:
+        finish_rerun()
+
+
+def finish_rerun():
+    recorder = _recorder.get()
+    if recorder is None:
+        return None
+    _recorder.set(None)
+    record = recorder.record()
+    if LOG_ENABLED:
+        os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with _log_lock:
+            if os.path.exists(LOG_PATH) and os.path.getsize(LOG_PATH) >= LOG_MAX_BYTES:
+                os.replace(LOG_PATH, f"{LOG_PATH}.1")
+            with open(LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(line)
+    return record
+
+
+def _tail_lines(path, last):
+    # Les last dernières lignes non vides (toutes si last est None), en lisant le fichier
+    # par blocs depuis la fin
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        if last is None:
+            data = f.read()
+        else:
+            end = f.seek(0, os.SEEK_END)
+            data = b""
+            while end > 0 and data.count(b"\n") <= last:
+                start = max(0, end - _TAIL_BLOCK)
+                f.seek(start)
+                data = f.read(end - start) + data
+                end = start
+    lines = [line for line in data.decode("utf-8", errors="ignore").splitlines() if line.strip()]
+    return lines[-last:] if last else lines
+
+
+def read_log(path=LOG_PATH, last=None):
+    # Une ligne par (rerun, étape) : ts, user, fragment, total_ms, stage, ms, rows, rss_mb, rss_delta_mb
+    # (fragment : nom de la zone pour un rerun partiel, vide pour un rerun complet)
+    # last : nombre de reruns lus depuis la fin, complété par le journal précédent (.1) si besoin
+    lines = _tail_lines(path, last)
+    if last is None or len(lines) < last:
+        lines = _tail_lines(f"{path}.1", last - len(lines) if last else None) + lines
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:  # ligne tronquée (arrêt pendant l'écriture, rotation concurrente)
+            continue
+    if not records:
+        return pd.DataFrame(columns=["ts", "user", "fragment", "total_ms", "stage", "ms", "rows", "rss_mb", "rss_delta_mb"])
+    return pd.json_normalize(records, record_path="stages", meta=["ts", "user", "fragment", "total_ms"], errors="ignore")
+
+
+def summarize_log(path=LOG_PATH, last=1000):
+    # Médiane / p95 par étape sur les derniers reruns (tous utilisateurs)
+    log = read_log(path, last)
+    if log.empty:
+        return pd.DataFrame(columns=["stage", "calls", "p50_ms", "p95_ms", "max_rows"])
+    grouped = log.groupby("stage")
+    return pd.DataFrame({
+        "calls": grouped.size(),
+        "p50_ms": grouped["ms"].median().round(2),
+        "p95_ms": grouped["ms"].quantile(0.95).round(2),
+        "max_rows": grouped["rows"].max(),
+    }).sort_values("p95_ms", ascending=False).reset_index()
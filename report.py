@@ -0,0 +1,175 @@
+"""Rapports hors navigateur : statistiques et graphiques du dashboard pour chaque utilisateur.
+
+Parcourt data/<user>/, recalcule compute_stats_dict et les plot_* de utils_visuals
+sur tout l'historique, et écrit un rapport HTML statique et/ou les stats en JSON.
+Les utilisateurs sont traités en parallèle (un processus par utilisateur).
+
+Usage : python report.py [--data-dir data] [--out reports] [--format html|json|both]
+                         [--workers N] [--user EMAIL ...]
+"""
+import argparse
+import html
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import trade_store
+from data_cleaner import add_trade_metrics
+from trade_filters import TradeIndex
+import utils_visuals as uv
+
+# Sections du rapport, dans l'ordre du dashboard
+REPORT_SECTIONS = [
+    ("🎰 Profit / Risk Zone", [uv.plot_equity_curve, uv.plot_drawdown_curve, uv.plot_daily_pnl, uv.plot_daily_drawdown]),
+    ("🏄‍♂️ Timing Zone", [uv.plot_avg_duration_per_day, uv.plot_return_vs_duration, uv.plot_pnl_by_day_of_week, uv.plot_pnl_by_hour, uv.plot_pnl_heatmap_weekday_hour]),
+    ("🧀 Distribution", [uv.plot_asset_distribution, uv.plot_gain_loss_pie]),
+    ("👨‍🔬 Optimisation des targets", [uv.plot_histogram_mae_mfe_etd, uv.plot_scatter_mfe_vs_profit]),
+]
+
+STAT_LABELS = {
+    "total_trades": "Total Trades",
+    "winrate": "Winrate (%)",
+    "total_profit": "Profit total ($)",
+    "avg_gain": "Gain Moyen ($)",
+    "avg_loss": "Perte Moyenne ($)",
+    "profit_factor": "Profit Factor",
+    "max_drawdown": "Max Drawdown ($)",
+    "avg_duration": "Durée moyenne (min)",
+    "best_trade": "Meilleur Trade ($)",
+    "worst_trade": "Pire Trade ($)",
+    "sharpe_ratio": "Sharpe Ratio",
+}
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>🥷 Rapport {user}</title>
+<style>
+    body {{ font-family: 'Inter', sans-serif; background: #0e1117; color: #fafafa; margin: 2rem; }}
+    table {{ border-collapse: collapse; }}
+    td {{ padding: 4px 16px; border-bottom: 1px solid #333; }}
+    .grid {{ display: grid; grid-template-columns: 1fr 1fr; gap: 1rem; }}
+</style>
+</head>
+<body>
+<h1>🥷 Dashboard NinjaTrader : {user}</h1>
+<p>{period} · généré le {generated}</p>
+<h2>📊 Statistiques</h2>
+<table>{stats}</table>
+{sections}
+</body>
+</html>
+"""
+
+
+def list_users(data_dir):
+    return sorted(
+        name for name in os.listdir(data_dir)
+        if os.path.isdir(os.path.join(data_dir, name)) and not name.startswith(".")
+    )
+
+
+def _json_value(value):
+    # Scalaires numpy / pandas -> types JSON
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def _write_text(path, text):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def render_html(user, analytics, stats, period, generated):
+    rows = "".join(
+        f"<tr><td>{html.escape(STAT_LABELS.get(key, key))}</td><td>{value}</td></tr>"
+        for key, value in stats.items()
+    )
+    sections = []
+    include_plotlyjs = "cdn"  # plotly.js chargé une seule fois par page
+    for title, plots in REPORT_SECTIONS:
+        figures = []
+        for plot in plots:
+            figures.append(plot(analytics).to_html(full_html=False, include_plotlyjs=include_plotlyjs))
+            include_plotlyjs = False
+        sections.append(f"<h2>{title}</h2>\n<div class=\"grid\">{''.join(figures)}</div>")
+
+    return HTML_TEMPLATE.format(
+        user=html.escape(user),
+        period=html.escape(period),
+        generated=generated,
+        stats=rows,
+        sections="\n".join(sections),
+    )
+
+
+def build_report(data_dir, user, out_dir, formats):
+    # Exécuté dans un processus du pool : renvoie (user, nombre de trades, fichiers écrits)
+    user_dir = os.path.join(data_dir, user)
+    trade_store.migrate_csv_history(user_dir)
+    df = add_trade_metrics(trade_store.read_trades(user_dir))
+    analytics = uv.TradeAnalytics(TradeIndex(df).select())
+    stats = uv.compute_stats_dict(analytics)
+
+    summary = trade_store.store_summary(user_dir)
+    if summary["start"] is not None:
+        period = f"{summary['start'].date()} → {summary['end'].date()}"
+    else:
+        period = "aucun trade"
+    generated = datetime.now().isoformat(timespec="seconds")
+
+    user_out = os.path.join(out_dir, user)
+    os.makedirs(user_out, exist_ok=True)
+    written = []
+    if "json" in formats:
+        path = os.path.join(user_out, "stats.json")
+        payload = {"user": user, "period": period, "generated": generated, "stats": stats}
+        _write_text(path, json.dumps(payload, ensure_ascii=False, indent=2, default=_json_value))
+        written.append(path)
+    if "html" in formats:
+        path = os.path.join(user_out, "report.html")
+        _write_text(path, render_html(user, analytics, stats, period, generated))
+        written.append(path)
+    return user, len(df), written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--out", default="reports")
+    parser.add_argument("--format", choices=["html", "json", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=None, help="processus (défaut : nombre de CPU)")
+    parser.add_argument("--user", action="append", help="limiter à cet utilisateur (répétable)")
+    args = parser.parse_args(argv)
+
+    formats = {"html", "json"} if args.format == "both" else {args.format}
+    users = args.user or list_users(args.data_dir)
+    if not users:
+        print(f"Aucun utilisateur dans {args.data_dir}/")
+        return 0
+
+    failures = 0
+    workers = args.workers or min(len(users), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            user: pool.submit(build_report, args.data_dir, user, args.out, formats)
+            for user in users
+        }
+        for user, future in futures.items():
+            try:
+                _, n_trades, written = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"❌ {user} : {e}", file=sys.stderr)
+                continue
+            print(f"✅ {user} : {n_trades} trades -> {', '.join(written)}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# ─────────────────────────────────────────────────────────────────────────
+# Simulation stop / target sur MAE / MFE
+#
+# Chaque trade est rejoué sous chaque couple (stop, target) de la grille :
+#   - MAE >= stop            -> perte de -stop
+#   - sinon MFE >= target    -> gain de +target
+#   - sinon                  -> profit réellement réalisé
+# MAE / MFE ne disent pas lequel a été touché en premier : quand les deux le
+# sont, on retient le stop (hypothèse prudente).
+#
+# Le cube trades × stops × targets n'est jamais construit : pour un stop donné,
+# un trade non stoppé est soit pris au target, soit clôturé normalement, ce qui
+# se compte par produit matriciel entre indicatrices construites par broadcasting :
+#   (MAE < stop)ᵀ @ [MFE >= target, (MFE < target) * profit+, ...]
+# Les trades sont traités par paquets (mémoire bornée par MAX_CELLS_PER_CHUNK)
+# et, au-delà de PARALLEL_MIN_CELLS, répartis entre processus ; chaque paquet
+# ne renvoie que des sommes par cellule.
+# ─────────────────────────────────────────────────────────────────────────
+MAX_CELLS_PER_CHUNK = 2_000_000
+PARALLEL_MIN_CELLS = 1_000_000_000
+GRID_SIZE = 60
+METRICS = ("total_pnl", "winrate", "profit_factor")
+
+
+def default_grid(mae, mfe, size=GRID_SIZE):
+    # Stops et targets de 1/size au 95e centile des excursions observées
+    def levels(values):
+        values = np.abs(values[~np.isnan(values)])
+        top = np.percentile(values, 95) if len(values) else 0
+        top = top if top > 0 else 1.0
+        return np.linspace(top / size, top, size)
+
+    return levels(np.asarray(mae, dtype=float)), levels(np.asarray(mfe, dtype=float))
+
+
+def _simulate_block(mae, mfe, profit, stops, targets):
+    # Sommes par cellule (stop, target) pour un bloc de trades, par paquets bornés
+    n_stops, n_targets = len(stops), len(targets)
+    chunk = max(1, MAX_CELLS_PER_CHUNK // (n_stops + 4 * n_targets))
+    stopped = np.zeros(n_stops)
+    # Colonnes : [pris au target | profit+ | profit- | gagnant] des trades non stoppés
+    sums = np.zeros((n_stops, 4 * n_targets))
+
+    for lo in range(0, len(profit), chunk):
+        p = profit[lo:lo + chunk, None]
+        alive = mae[lo:lo + chunk, None] < stops[None, :]
+        hit_target = mfe[lo:lo + chunk, None] >= targets[None, :]
+        open_trade = ~hit_target
+        outcomes = np.hstack([
+            hit_target,
+            open_trade * np.maximum(p, 0.0),
+            open_trade * np.minimum(p, 0.0),
+            open_trade & (p > 0),
+        ]).astype(float)
+
+        stopped += len(p) - alive.sum(axis=0)
+        sums += alive.astype(float).T @ outcomes
+
+    at_target, open_gain, open_loss, open_wins = np.split(sums, 4, axis=1)
+    stop_loss = (stops * stopped)[:, None]
+    target_gain = targets[None, :] * at_target
+    return (
+        target_gain + open_gain + open_loss - stop_loss,
+        at_target + open_wins,
+        target_gain + open_gain,
+        stop_loss - open_loss,
+    )
+
+
+def simulate_stop_target(mae, mfe, profit, stops, targets, workers=None):
+    # Renvoie {total_pnl, winrate, profit_factor} : tableaux (len(stops), len(targets))
+    valid = ~(np.isnan(mae) | np.isnan(mfe) | np.isnan(profit))
+    mae, mfe, profit = np.abs(mae[valid]), np.abs(mfe[valid]), profit[valid]
+    stops, targets = np.asarray(stops, dtype=float), np.asarray(targets, dtype=float)
+    n = len(profit)
+
+    cells = n * len(stops) * len(targets)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and cells >= PARALLEL_MIN_CELLS:
+        bounds = np.linspace(0, n, workers + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_simulate_block, mae[a:b], mfe[a:b], profit[a:b], stops, targets)
+                for a, b in zip(bounds[:-1], bounds[1:])
+            ]
+            parts = [future.result() for future in futures]
+        pnl, wins, gross_win, gross_loss = (sum(values) for values in zip(*parts))
+    else:
+        pnl, wins, gross_win, gross_loss = _simulate_block(mae, mfe, profit, stops, targets)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "stops": stops,
+            "targets": targets,
+            "total_pnl": pnl,
+            "winrate": wins / n * 100 if n else np.zeros_like(pnl),
+            "profit_factor": np.where(gross_loss > 0, gross_win / gross_loss, np.nan),
+        }
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from trade_filters import ALL, day_bounds
+
+# ─────────────────────────────────────────────────────────────────────────
+# Cube timing persistant (maintenu à l'import par trade_store)
+#
+# Une ligne par (Instrument, Position, jour d'entrée, heure d'entrée) non vide,
+# pour chaque combinaison de filtres du dashboard ("Tous" compris) :
+#   profit_sum, count, wins
+#
+# Le jour est conservé pour répondre aux filtres de période : les lignes d'une
+# combinaison sont triées par jour, une période est une tranche (searchsorted)
+# ventilée en jour de semaine × heure par un seul bincount.
+#
+# Stocké par mois (trade_store) : chaque mois est trié par combinaison puis par
+# jour, la concaténation des mois dans l'ordre l'est donc aussi par combinaison.
+# ─────────────────────────────────────────────────────────────────────────
+KEY_COLUMNS = ["Instrument", "Direction", "Date", "Hour"]
+VALUE_COLUMNS = ["profit_sum", "count", "wins"]
+CUBE_COLUMNS = KEY_COLUMNS + VALUE_COLUMNS
+N_CELLS = 7 * 24
+
+
+def rollup_trades(df):
+    # Lignes du cube de toutes les combinaisons de filtres, triées par combinaison puis par jour
+    df = df[pd.notnull(df["Entry time"])]
+    if df.empty:
+        return pd.DataFrame(columns=CUBE_COLUMNS).astype({col: float for col in VALUE_COLUMNS})
+
+    frame = pd.DataFrame({
+        "Instrument": df["Instrument"].astype(object).to_numpy(),
+        "Direction": df["Market pos."].astype(object).to_numpy(),
+        "Date": df["Entry time"].dt.normalize().to_numpy(),
+        "Hour": df["Entry time"].dt.hour.to_numpy(),
+        "profit_sum": np.nan_to_num(df["Profit"].to_numpy(dtype=float)),
+        "count": 1.0,
+        "wins": (df["Profit"].to_numpy(dtype=float) > 0).astype(float),
+    })
+    # Agrégation la plus fine, puis marges "Tous" par somme des lignes fines
+    fine = frame.groupby(KEY_COLUMNS, sort=False, dropna=False)[VALUE_COLUMNS].sum().reset_index()
+    margins = [fine]
+    for keys, total in (
+        (["Instrument"], {"Direction": ALL}),
+        (["Direction"], {"Instrument": ALL}),
+        ([], {"Instrument": ALL, "Direction": ALL}),
+    ):
+        part = fine.groupby(keys + ["Date", "Hour"], sort=False, dropna=False)[VALUE_COLUMNS].sum().reset_index()
+        margins.append(part.assign(**total))
+    cube = pd.concat(margins, ignore_index=True)
+    return cube.sort_values(KEY_COLUMNS, kind="stable", ignore_index=True)[CUBE_COLUMNS]
+
+
+def combine_months(frames):
+    # Cubes mensuels dans l'ordre des mois -> cube complet (sans nouveau tri)
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return rollup_trades(pd.DataFrame(columns=["Entry time"]))
+    return pd.concat(frames, ignore_index=True)[CUBE_COLUMNS]
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Lecture : matrices jour de semaine (0 = lundi) × heure
+# ─────────────────────────────────────────────────────────────────────────
+class TimingCube:
+    def __init__(self, cube):
+        self.groups = {}
+        for (instrument, direction), rows in cube.groupby(["Instrument", "Direction"], sort=False):
+            days = rows["Date"].to_numpy().astype("datetime64[D]")
+            # 1970-01-01 est un jeudi : (jours + 3) % 7 donne 0 pour lundi
+            weekday = (days.astype(np.int64) + 3) % 7
+            self.groups[(instrument, direction)] = {
+                "Date": days,
+                "cell": weekday * 24 + rows["Hour"].to_numpy(dtype=np.int64),
+                **{col: rows[col].to_numpy(dtype=float) for col in VALUE_COLUMNS},
+            }
+
+    def cells(self, instrument=ALL, direction=ALL, start=None, end=None):
+        # {profit_sum, count, wins} -> tableaux 7 × 24
+        group = self.groups.get((instrument, direction))
+        if group is None:
+            return {col: np.zeros((7, 24)) for col in VALUE_COLUMNS}
+        first, last = day_bounds(start, end)
+        lo = group["Date"].searchsorted(first, side="left")
+        hi = group["Date"].searchsorted(last, side="right")
+        cell = group["cell"][lo:hi]
+        return {
+            col: np.bincount(cell, weights=group[col][lo:hi], minlength=N_CELLS).reshape(7, 24)
+            for col in VALUE_COLUMNS
+        }
+
+    def timing(self, instrument=ALL, direction=ALL, start=None, end=None):
+        # Même forme que TradeAnalytics.timing : PnL indexé par (Weekday, Hour), cellules non vides
+        cells = self.cells(instrument, direction, start, end)
+        weekday, hour = np.nonzero(cells["count"])
+        index = pd.MultiIndex.from_arrays([weekday, hour], names=["Weekday", "Hour"])
+        return pd.Series(cells["profit_sum"][weekday, hour], index=index, name="Profit")
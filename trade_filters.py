@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+ALL = "Tous"
+
+# Statistiques d'une sélection sans trade (compute_stats_dict, DailyRollup.range_stats)
+EMPTY_STATS = {
+    "total_trades": 0,
+    "winrate": 0,
+    "total_profit": 0,
+    "avg_gain": 0,
+    "avg_loss": 0,
+    "profit_factor": 0,
+    "max_drawdown": 0,
+    "avg_duration": 0,
+    "best_trade": 0,
+    "worst_trade": 0,
+    "sharpe_ratio": 0,
+}
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Index de filtrage de l'historique
+#
+# Construit une fois par historique chargé (puis mis en cache) :
+#   - trades triés par "Entry time" -> une période = une tranche [lo, hi)
+#     trouvée par searchsorted, sans parcourir les lignes
+#   - Instrument et "Market pos." encodés en codes catégoriels (int8)
+# Les résultats sont des tranches de l'historique (pas de copie) tant
+# qu'aucun filtre instrument / position n'est actif. Ils sont partagés et
+# doivent être traités en lecture seule.
+# ─────────────────────────────────────────────────────────────────────────
+class TradeIndex:
+    def __init__(self, df):
+        if not df["Entry time"].is_monotonic_increasing:
+            df = df.sort_values("Entry time", kind="stable", ignore_index=True)
+        self.trades = df
+        self.entry_times = df["Entry time"].to_numpy()
+
+        instruments = pd.Categorical(df["Instrument"])
+        directions = pd.Categorical(df["Market pos."])
+        self.instrument_codes = instruments.codes
+        self.instruments = instruments.categories
+        self.direction_codes = directions.codes
+        self.directions = directions.categories
+
+    def __len__(self):
+        return len(self.trades)
+
+    def date_bounds(self, start=None, end=None):
+        # Positions [lo, hi) des trades dont la date d'entrée est dans [start, end] (dates incluses)
+        lo, hi = 0, len(self.trades)
+        if start is not None:
+            lo = self.entry_times.searchsorted(np.datetime64(pd.Timestamp(start)), side="left")
+        if end is not None:
+            end = pd.Timestamp(end) + timedelta(days=1)
+            hi = self.entry_times.searchsorted(np.datetime64(end), side="left")
+        return lo, max(lo, hi)
+
+    def select(self, instrument=ALL, direction=ALL, start=None, end=None):
+        lo, hi = self.date_bounds(start, end)
+        mask = None
+
+        if instrument != ALL:
+            mask = self.instrument_codes[lo:hi] == _code(self.instruments, instrument)
+        if direction != ALL:
+            direction_mask = self.direction_codes[lo:hi] == _code(self.directions, direction)
+            mask = direction_mask if mask is None else mask & direction_mask
+
+        if mask is None:
+            return self.trades.iloc[lo:hi]
+        return self.trades.take(lo + np.flatnonzero(mask))
+
+
+def day_bounds(start=None, end=None):
+    # [start, end] (dates incluses, None = sans borne) en jours datetime64[D], pour
+    # searchsorted sur les colonnes Date des agrégats (daily_rollup, timing_cube)
+    first = np.datetime64("1900-01-01", "D") if start is None else np.datetime64(pd.Timestamp(start).date(), "D")
+    last = np.datetime64("2999-12-31", "D") if end is None else np.datetime64(pd.Timestamp(end).date(), "D")
+    return first, last
+
+
+def _code(categories, value):
+    # Valeur absente de l'historique chargé : code -2, qui ne correspond à aucune ligne
+    try:
+        return categories.get_loc(value)
+    except KeyError:
+        return -2
+
+
+def sort_positions(df, column, ascending=True):
+    # Ordre d'affichage (positions) de df trié sur column, valeurs manquantes en dernier.
+    # df issu de TradeIndex est déjà trié par "Entry time" : cet ordre est réutilisé tel quel.
+    n = len(df)
+    if column == "Entry time" and df["Entry time"].is_monotonic_increasing:
+        return np.arange(n) if ascending else np.arange(n - 1, -1, -1)
+
+    values = pd.Series(df[column].to_numpy())
+    return values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
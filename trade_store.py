@@ -0,0 +1,475 @@
+import json
+import os
+import uuid
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import daily_rollup
+import timing_cube
+from file_lock import dir_lock
+
+# ─────────────────────────────────────────────────────────────────────────
+# Stockage colonnaire de l'historique, partitionné par mois d'entrée
+#
+#   data/<user>/trades/
+#       _manifest.json     résumé par mois (nb de trades, bornes, fichiers…)
+#       2024-05/
+#           _ids.txt       index des trade_id déjà importés (un par ligne)
+#           part-<uuid>.parquet
+#           part-<uuid>.parquet
+#           _daily-<uuid>.parquet   agrégats journaliers du mois (voir daily_rollup)
+#           _timing-<uuid>.parquet  cube jour de semaine × heure du mois (voir timing_cube)
+#
+# Un import ajoute un fichier part-*.parquet par mois touché et complète
+# _ids.txt : il ne relit ni ne réécrit jamais les trades existants.
+#
+# Le manifest est le point de validation : il est remplacé atomiquement et
+# référence les fichiers part-* ainsi que la taille validée de chaque _ids.txt.
+# Un import interrompu ne laisse que des fichiers non référencés, ignorés.
+# Les agrégats (_daily-*, _timing-*) sont stockés par mois : seuls ceux des mois
+# touchés sont recalculés, dans la même transaction, et le manifest référence
+# toujours des agrégats à jour. Le coût d'un import ne dépend pas de l'historique.
+# ─────────────────────────────────────────────────────────────────────────
+TRADES_DIR = "trades"
+MANIFEST_FILE = "_manifest.json"
+IDS_FILE = "_ids.txt"
+LEGACY_CSV = "trades_historique.csv"
+
+# Au-delà de ce nombre de fichiers, un mois est recompacté en un seul fichier
+MAX_PARTS_PER_MONTH = 16
+
+HISTORY_COLUMNS = [
+    "Entry time", "Exit time", "Instrument", "Contract", "Market pos.",
+    "Entry price", "Exit price", "Qty", "Profit",
+    "MAE", "MFE", "ETD"
+]
+DATE_COLUMNS = ["Entry time", "Exit time"]
+
+
+def store_dir(user_dir):
+    return os.path.join(user_dir, TRADES_DIR)
+
+
+def _month_dir(user_dir, month):
+    return os.path.join(store_dir(user_dir), month)
+
+
+def _month_parts(manifest, month):
+    # Les stores créés avant le découpage en fichiers part-* ont un seul fichier <mois>.parquet
+    return manifest["months"].get(month, {}).get("parts", [f"{month}.parquet"])
+
+
+def _month_keys(entry_times):
+    # "YYYY-MM" par ligne : seuls les mois distincts sont formatés (strftime ligne à ligne coûteux)
+    months, inverse = np.unique(entry_times.to_numpy().astype("datetime64[M]"), return_inverse=True)
+    return pd.Series(np.datetime_as_string(months, unit="M")[inverse], index=entry_times.index)
+
+
+def split_instrument(df):
+    # "NQ 06-24" -> Instrument "NQ", Contract "NQ 06-24" (calculé une fois, à l'import)
+    if "Contract" not in df.columns:
+        df["Contract"] = df["Instrument"]
+        df["Instrument"] = df["Instrument"].astype(str).str.extract(r"^([A-Z]+)", expand=False)
+    return df
+
+
+def trade_ids(df):
+    # Identifiant de dédoublonnage : numéro de trade + heure d'entrée
+    if "Trade number" in df.columns:
+        return df["Trade number"].astype(str) + "_" + df["Entry time"].astype(str)
+    return df.index.astype(str) + "_" + df["Entry time"].astype(str)
+
+
+def empty_history():
+    df = pd.DataFrame(columns=HISTORY_COLUMNS)
+    for col in DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col])
+    return df
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Manifest
+# ─────────────────────────────────────────────────────────────────────────
+def load_manifest(user_dir):
+    path = os.path.join(store_dir(user_dir), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"months": {}}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_manifest(user_dir, manifest):
+    os.makedirs(store_dir(user_dir), exist_ok=True)
+    _atomic_write(
+        os.path.join(store_dir(user_dir), MANIFEST_FILE),
+        lambda tmp: _write_json(tmp, manifest),
+    )
+
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Écriture atomique et verrou par utilisateur
+# ─────────────────────────────────────────────────────────────────────────
+def _atomic_write(path, write):
+    # write(tmp_path) écrit le contenu complet ; le fichier final est remplacé d'un coup
+    tmp = f"{path}.tmp-{uuid.uuid4().hex}"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _describe_partition(df, previous=None):
+    # Résumé d'un mois, fusionné avec le résumé existant lors d'un ajout
+    summary = {
+        "rows": len(df),
+        "start": df["Entry time"].min().isoformat(),
+        "end": df["Entry time"].max().isoformat(),
+        "instruments": sorted(df["Instrument"].dropna().astype(str).unique().tolist()),
+        "directions": sorted(df["Market pos."].dropna().astype(str).unique().tolist()),
+        "parts": [],
+    }
+    if previous:
+        summary["rows"] += previous["rows"]
+        summary["start"] = min(summary["start"], previous["start"])
+        summary["end"] = max(summary["end"], previous["end"])
+        summary["instruments"] = sorted(set(summary["instruments"]) | set(previous["instruments"]))
+        summary["directions"] = sorted(set(summary["directions"]) | set(previous["directions"]))
+        summary["parts"] = previous.get("parts", [])
+        summary["aggregates"] = previous.get("aggregates", {})
+    return summary
+
+
+def store_version(user_dir):
+    # Change à chaque validation (le manifest est remplacé) : sert de clé de cache
+    path = os.path.join(store_dir(user_dir), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def store_summary(user_dir):
+    # Bornes et modalités de tout l'historique, sans lire une seule partition
+    months = load_manifest(user_dir)["months"]
+    if not months:
+        return {"rows": 0, "start": None, "end": None, "instruments": [], "directions": []}
+
+    return {
+        "rows": sum(m["rows"] for m in months.values()),
+        "start": pd.Timestamp(min(m["start"] for m in months.values())),
+        "end": pd.Timestamp(max(m["end"] for m in months.values())),
+        "instruments": sorted({i for m in months.values() for i in m["instruments"]}),
+        "directions": sorted({d for m in months.values() for d in m["directions"]}),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Lecture / écriture
+# ─────────────────────────────────────────────────────────────────────────
+def list_months(user_dir, start=None, end=None):
+    months = sorted(load_manifest(user_dir)["months"])
+    if start is not None:
+        months = [m for m in months if m >= pd.Timestamp(start).strftime("%Y-%m")]
+    if end is not None:
+        months = [m for m in months if m <= pd.Timestamp(end).strftime("%Y-%m")]
+    return months
+
+
+def _read_files(user_dir, manifest, names_of):
+    # Lit les fichiers names_of(manifest) (chemins relatifs au store). Sans manifest fourni,
+    # un import ou compactage concurrent peut les avoir remplacés entre la lecture du manifest
+    # et celle des fichiers : une seule relecture avec le nouveau manifest. Fichier toujours
+    # absent (ou manifest fourni par l'appelant) : store incohérent, erreur explicite.
+    retry = manifest is None
+    while True:
+        if manifest is None:
+            manifest = load_manifest(user_dir)
+        try:
+            return [pd.read_parquet(os.path.join(store_dir(user_dir), name)) for name in names_of(manifest)]
+        except FileNotFoundError as e:
+            if not retry:
+                raise FileNotFoundError(
+                    f"Store incohérent : {e.filename} est référencé par le manifest mais introuvable"
+                ) from e
+            retry, manifest = False, None
+
+
+def read_partitions(user_dir, months, manifest=None):
+    frames = _read_files(
+        user_dir,
+        manifest,
+        lambda manifest: [part for m in months if m in manifest["months"] for part in _month_parts(manifest, m)],
+    )
+    frames = [split_instrument(f) for f in frames if not f.empty]
+    if not frames:
+        return empty_history()
+    df = pd.concat(frames, ignore_index=True)
+    if len(frames) > 1:
+        df = df.sort_values("Entry time", kind="stable", ignore_index=True)
+    return df
+
+
+def read_trades(user_dir, start=None, end=None):
+    # start / end : dates incluses. Seules les partitions des mois concernés sont lues.
+    df = read_partitions(user_dir, list_months(user_dir, start, end))
+    if start is not None:
+        df = df[df["Entry time"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["Entry time"] < pd.Timestamp(end) + timedelta(days=1)]
+    return df.reset_index(drop=True)
+
+
+def months_of(df):
+    return sorted(_month_keys(df["Entry time"].dropna()).unique().tolist())
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Index persistant des trade_id
+# ─────────────────────────────────────────────────────────────────────────
+def _month_ids(user_dir, manifest, month):
+    # Identifiants validés d'un mois ; complète manifest (en mémoire) si l'index est reconstruit
+    summary = manifest["months"].get(month)
+    if summary is None:
+        return set()
+
+    path = os.path.join(_month_dir(user_dir, month), IDS_FILE)
+    if "ids_bytes" in summary:
+        with open(path, "rb") as f:
+            return set(f.read(summary["ids_bytes"]).decode().splitlines())
+
+    # Mois écrit avant l'index (migration, ancien store) : reconstruction une seule fois
+    df = read_partitions(user_dir, [month], manifest)
+    ids = trade_ids(df).tolist() if not df.empty else []
+    data = "".join(f"{i}\n" for i in ids).encode()
+    os.makedirs(_month_dir(user_dir, month), exist_ok=True)
+    _atomic_write(path, lambda tmp: _write_bytes(tmp, data))
+    summary["ids_bytes"] = len(data)
+    return set(ids)
+
+
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _append_ids(path, committed, ids):
+    # Tronque la fin non validée (import interrompu) avant d'ajouter les nouveaux identifiants
+    data = "".join(f"{i}\n" for i in ids).encode()
+    with open(path, "a+b") as f:
+        f.truncate(committed)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return committed + len(data)
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Import : une transaction par fichier importé
+# ─────────────────────────────────────────────────────────────────────────
+def ingest_trades(user_dir, df_new):
+    # Dédoublonne df_new (avec sa colonne trade_id) contre l'index des mois touchés,
+    # écrit les nouveaux trades et valide le tout par un seul remplacement du manifest.
+    # Renvoie les trades effectivement ajoutés.
+    df_new = df_new[pd.notnull(df_new["Entry time"])].drop_duplicates(subset="trade_id")
+
+    with dir_lock(user_dir):
+        manifest = load_manifest(user_dir)
+        known = set()
+        for month in months_of(df_new):
+            known |= _month_ids(user_dir, manifest, month)
+
+        df_to_add = df_new[~df_new["trade_id"].isin(known)]
+        if df_to_add.empty:
+            return df_to_add
+
+        _stage_trades(user_dir, manifest, df_to_add)
+        old_aggregates = _stage_aggregates(user_dir, manifest, months_of(df_to_add))
+        _save_manifest(user_dir, manifest)
+        _remove_files(user_dir, old_aggregates)
+
+        for month in months_of(df_to_add):
+            if len(manifest["months"][month]["parts"]) > MAX_PARTS_PER_MONTH:
+                _compact_month(user_dir, manifest, month)
+
+    return df_to_add
+
+
+def _stage_trades(user_dir, manifest, df):
+    # Écrit fichiers part-* et identifiants ; rien n'est visible avant _save_manifest
+    for month, part in df.groupby(_month_keys(df["Entry time"]), sort=True):
+        month_dir = _month_dir(user_dir, month)
+        os.makedirs(month_dir, exist_ok=True)
+        previous = manifest["months"].get(month)
+        if previous is not None:
+            if "ids_bytes" not in previous:
+                _month_ids(user_dir, manifest, month)
+            previous = dict(previous, parts=_month_parts(manifest, month))
+
+        part = part.sort_values("Entry time", kind="stable").reset_index(drop=True)
+        part_name = f"part-{uuid.uuid4().hex}.parquet"
+        _atomic_write(
+            os.path.join(month_dir, part_name),
+            lambda tmp: part.drop(columns=["trade_id"]).to_parquet(tmp, index=False),
+        )
+        ids_bytes = _append_ids(
+            os.path.join(month_dir, IDS_FILE),
+            previous["ids_bytes"] if previous else 0,
+            part["trade_id"].astype(str),
+        )
+
+        summary = _describe_partition(part, previous)
+        summary["parts"] = summary["parts"] + [f"{month}/{part_name}"]
+        summary["ids_bytes"] = ids_bytes
+        manifest["months"][month] = summary
+
+
+def _compact_month(user_dir, manifest, month):
+    # Regroupe les fichiers d'un mois en un seul (l'index _ids.txt est inchangé)
+    old_parts = _month_parts(manifest, month)
+    df = read_partitions(user_dir, [month], manifest)
+
+    part_name = f"part-{uuid.uuid4().hex}.parquet"
+    _atomic_write(
+        os.path.join(_month_dir(user_dir, month), part_name),
+        lambda tmp: df.to_parquet(tmp, index=False),
+    )
+    manifest["months"][month]["parts"] = [f"{month}/{part_name}"]
+    _save_manifest(user_dir, manifest)
+
+    for part in old_parts:
+        os.remove(os.path.join(store_dir(user_dir), part))
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Agrégats persistants : clé -> (préfixe du fichier, module)
+# Chaque module expose rollup_trades(df) (lignes d'un mois, triées par combinaison
+# de filtres puis par jour) et combine_months(frames) (mois dans l'ordre -> agrégat).
+# Le manifest référence les fichiers de chaque mois : months[mois]["aggregates"][clé].
+# ─────────────────────────────────────────────────────────────────────────
+AGGREGATES = {
+    "rollup": ("_daily", daily_rollup),
+    "timing": ("_timing", timing_cube),
+}
+
+
+def _stage_aggregates(user_dir, manifest, months):
+    # Recalcule les agrégats des mois touchés à partir de leurs partitions (déjà écrites) ;
+    # renvoie les fichiers remplacés, à supprimer après validation du manifest.
+    # Les lignes sont journalières : un seul calcul pour tous les mois, découpé ensuite par mois.
+    if not months:
+        return []
+    trades = read_partitions(user_dir, months, manifest)
+    by_month = {}
+    for key, (_, module) in AGGREGATES.items():
+        rows = module.rollup_trades(trades)
+        by_month[key] = dict(tuple(rows.groupby(_month_keys(rows["Date"]), sort=False)))
+
+    old_files = []
+    for month in months:
+        summary = manifest["months"][month]
+        aggregates = dict(summary.get("aggregates", {}))
+        for key, (prefix, module) in AGGREGATES.items():
+            rows = by_month[key].get(month)
+            if rows is None:
+                rows = module.rollup_trades(trades.iloc[:0])
+            name = f"{month}/{prefix}-{uuid.uuid4().hex}.parquet"
+            _atomic_write(os.path.join(store_dir(user_dir), name), lambda tmp: rows.to_parquet(tmp, index=False))
+            if key in aggregates:
+                old_files.append(aggregates[key])
+            aggregates[key] = name
+        summary["aggregates"] = aggregates
+    return old_files
+
+
+def _remove_files(user_dir, names):
+    for name in names:
+        try:
+            os.remove(os.path.join(store_dir(user_dir), name))
+        except FileNotFoundError:
+            pass
+
+
+def _stale_aggregates(manifest):
+    # Mois sans tous leurs agrégats (store antérieur), et anciens agrégats globaux
+    # (un seul fichier pour tout l'historique) encore référencés
+    months = [
+        month for month, summary in sorted(manifest["months"].items())
+        if not set(AGGREGATES) <= set(summary.get("aggregates", {}))
+    ]
+    return months, [key for key in AGGREGATES if key in manifest]
+
+
+def ensure_aggregates(user_dir):
+    # Stores créés avant les agrégats mensuels : construction unique, mois par mois
+    months, legacy = _stale_aggregates(load_manifest(user_dir))
+    if not months and not legacy:
+        return
+    with dir_lock(user_dir):
+        manifest = load_manifest(user_dir)
+        months, legacy = _stale_aggregates(manifest)
+        old_files = _stage_aggregates(user_dir, manifest, months)
+        old_files += [manifest.pop(key) for key in legacy]
+        _save_manifest(user_dir, manifest)
+        _remove_files(user_dir, old_files)
+
+
+def read_aggregate(user_dir, key):
+    # Agrégats mensuels lus dans l'ordre des mois et assemblés par le module
+    frames = _read_files(
+        user_dir,
+        None,
+        lambda manifest: [
+            summary["aggregates"][key]
+            for _, summary in sorted(manifest["months"].items())
+            if key in summary.get("aggregates", {})
+        ],
+    )
+    return AGGREGATES[key][1].combine_months(frames)
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Migration de l'ancien trades_historique.csv
+# ─────────────────────────────────────────────────────────────────────────
+def migrate_csv_history(user_dir):
+    csv_path = os.path.join(user_dir, LEGACY_CSV)
+    if not os.path.exists(csv_path):
+        return 0
+
+    with dir_lock(user_dir):
+        if not os.path.exists(csv_path) or load_manifest(user_dir)["months"]:
+            return 0
+        return _migrate_csv(user_dir, csv_path)
+
+
+def _migrate_csv(user_dir, csv_path):
+    df = pd.read_csv(csv_path, parse_dates=DATE_COLUMNS)
+    # Les anciens imports écrivaient l'historique deux fois (avec et sans trade_id) :
+    # on retire la colonne technique et les doublons qu'elle a laissés
+    df = df.drop(columns=["trade_id"], errors="ignore")
+    if "Trade number" in df.columns:
+        df = df.drop_duplicates(subset=["Trade number", "Entry time"])
+    else:
+        df = df.drop_duplicates()
+    for col in DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col], errors="coerce")
+
+    if not df.empty:
+        df = split_instrument(df[pd.notnull(df["Entry time"])].reset_index(drop=True))
+        df["trade_id"] = trade_ids(df)
+        manifest = load_manifest(user_dir)
+        _stage_trades(user_dir, manifest, df)
+        _stage_aggregates(user_dir, manifest, months_of(df))
+        _save_manifest(user_dir, manifest)
+    os.replace(csv_path, csv_path + ".migrated")
+    return len(df)
@@ -1,15 +1,15 @@
+import os
+
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import pandas as pd
-import calplot  # Nouveau module
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
+import numpy as np
+from functools import cached_property
 from datetime import datetime, timedelta
-import calendar
-import datetime as dt
-import yfinance as yf
-import plotly.graph_objects as go
+
+from perf import timed
+from trade_filters import EMPTY_STATS
 
 
 
@@ -19,16 +19,154 @@ COLOR_DRAWDOWN = "#ef4444"   # rouge vif foncé
 COLOR_PRESENCE = "#10b981"   # vert présent
 COLOR_ABSENCE = "#9ca3af"    # gris clair
 
-def plot_equity_curve(df):
-    if df.empty:
+# === Rendu des gros historiques ===
+# Au-delà de ce nombre de points (variable d'environnement MAX_PLOT_POINTS), les courbes
+# sont sous-échantillonnées (min/max par paquet, les extrêmes de drawdown sont conservés)
+# et les nuages de points sont éclaircis (points isolés et extrêmes conservés, voir
+# downsample_scatter) et passent en WebGL
+MAX_PLOT_POINTS = int(os.environ.get("MAX_PLOT_POINTS", "5000"))
+
+
+def downsample_minmax(y, max_points=None):
+    # Indices (triés) des points à tracer : premier, dernier, et pour chaque paquet de
+    # points consécutifs celui du minimum et celui du maximum
+    max_points = max_points or MAX_PLOT_POINTS
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+
+    n_buckets = max(1, (max_points - 2) // 2)
+    size = -(-n // n_buckets)
+    padded = np.empty(n_buckets * size)
+    padded[:n] = y
+    padded[n:] = y[-1]
+    buckets = padded.reshape(n_buckets, size)
+
+    base = np.arange(n_buckets) * size
+    idx = np.concatenate([[0, n - 1], base + buckets.argmin(axis=1), base + buckets.argmax(axis=1)])
+    return np.unique(np.minimum(idx, n - 1))
+
+
+def downsample_scatter(x, y, max_points=None):
+    # Indices (triés) d'au plus max_points points d'un nuage à tracer :
+    # - le premier point de chaque case d'une grille de max_points / 2 cases (les points
+    #   isolés restent donc visibles), plus les minimum et maximum de x et de y
+    # - le reste du budget en points régulièrement espacés parmi les autres (la densité
+    #   du nuage reste lisible)
+    max_points = max_points or MAX_PLOT_POINTS
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+
+    side = max(1, int(np.sqrt(max(max_points - 4, 2) / 2)))
+    cells = np.zeros(n, dtype=np.int64)
+    extremes = []
+    for values in (np.asarray(x, dtype=float), np.asarray(y, dtype=float)):
+        finite = np.isfinite(values)
+        if not finite.any():
+            continue
+        lo, hi = values[finite].min(), values[finite].max()
+        scale = side / (hi - lo) if hi > lo else 0.0
+        cell = np.minimum(((np.where(finite, values, lo) - lo) * scale).astype(np.int64), side - 1)
+        cells = cells * side + cell
+        extremes += [np.flatnonzero(values == lo)[0], np.flatnonzero(values == hi)[0]]
+
+    _, first = np.unique(cells, return_index=True)
+    keep = np.unique(np.concatenate([first, extremes]).astype(np.int64))
+    others = np.setdiff1d(np.arange(n), keep, assume_unique=True)
+    budget = max(max_points - len(keep), 0)
+    spread = others[np.linspace(0, len(others) - 1, budget).astype(np.int64)] if budget and len(others) else []
+    return np.union1d(keep, spread).astype(np.int64)
+
+
+def scatter_render_mode(n_points, max_points=None):
+    return "webgl" if n_points > (max_points or MAX_PLOT_POINTS) else "auto"
+
+
+def _scatter_sample(trades, x, y, title, max_points=None):
+    # Trades à tracer dans un nuage de points, et titre indiquant l'éclaircissement
+    keep = downsample_scatter(trades[x].to_numpy(dtype=float), trades[y].to_numpy(dtype=float), max_points)
+    if len(keep) == len(trades):
+        return trades, title
+    return trades.iloc[keep], f"{title} ({len(keep):,} points affichés sur {len(trades):,})"
+
+# ─────────────────────────────────────────────────────────────────────────
+# Données d'analyse partagées : un seul tri et un seul jeu de groupby par
+# jeu de trades filtré, réutilisés par toutes les fonctions plot_* / stats
+# ─────────────────────────────────────────────────────────────────────────
+class TradeAnalytics:
+    def __init__(self, df, daily=None, timing=None):
+        if not df.empty and not df["Entry time"].is_monotonic_increasing:
+            df = df.sort_values("Entry time", kind="stable")
+        self.trades = df
+        self.empty = df.empty
+
+        entry = df["Entry time"]
+        self.profit = df["Profit"].to_numpy(dtype=float)
+        self.cumulative = np.nancumsum(self.profit)
+        self.drawdown = self.cumulative - np.maximum.accumulate(self.cumulative)
+        self.trade_number = np.arange(1, len(df) + 1)
+        self.date = entry.dt.normalize()
+        self.hour = entry.dt.hour
+        self.weekday = entry.dt.dayofweek
+        if "Durée (min)" in df.columns:
+            self.duration = df["Durée (min)"]
+        else:
+            self.duration = (df["Exit time"] - entry).dt.total_seconds() / 60
+        # Agrégats déjà calculés (daily_rollup, timing_cube) : remplacent les propriétés calculées
+        if daily is not None:
+            self.daily = daily
+        if timing is not None:
+            self.timing = timing
+
+    @cached_property
+    def daily(self):
+        frame = pd.DataFrame({
+            "Date": self.date.to_numpy(),
+            "Profit": self.profit,
+            "Drawdown": self.drawdown,
+            "Durée (min)": self.duration.to_numpy(),
+        })
+        return frame.groupby("Date").agg(
+            Profit=("Profit", "sum"),
+            Drawdown=("Drawdown", "min"),
+            Duration=("Durée (min)", "mean"),
+        ).reset_index()
+
+    @cached_property
+    def timing(self):
+        # PnL par (jour de semaine, heure) : base commune des agrégats horaires et journaliers
+        frame = pd.DataFrame({
+            "Weekday": self.weekday.to_numpy(),
+            "Hour": self.hour.to_numpy(),
+            "Profit": self.profit,
+        })
+        return frame.groupby(["Weekday", "Hour"])["Profit"].sum()
+
+    @cached_property
+    def hourly(self):
+        return self.timing.groupby(level="Hour").sum()
+
+    @cached_property
+    def by_weekday(self):
+        return self.timing.groupby(level="Weekday").sum()
+
+
+def as_analytics(data):
+    return data if isinstance(data, TradeAnalytics) else TradeAnalytics(data)
+
+
+@timed
+def plot_equity_curve(df, max_points=None):
+    data = as_analytics(df)
+    if data.empty:
         return px.area(title="Aucune donnée")
 
-    df = df.sort_values("Entry time").copy()
-    df["Cumulative P&L"] = df["Profit"].cumsum()
-    df["Trade #"] = range(1, len(df) + 1)
+    keep = downsample_minmax(data.cumulative, max_points)
+    curve = pd.DataFrame({"Trade #": data.trade_number[keep], "Cumulative P&L": data.cumulative[keep]})
 
     fig = px.area(
-        df,
+        curve,
         x="Trade #",
         y="Cumulative P&L",
         title="📈 Courbe de Capital (par trade)",
@@ -38,17 +176,17 @@ def plot_equity_curve(df):
     return fig
 
 
-def plot_drawdown_curve(df):
-    if df.empty:
+@timed
+def plot_drawdown_curve(df, max_points=None):
+    data = as_analytics(df)
+    if data.empty:
         return px.area(title="Aucune donnée")
 
-    df = df.sort_values("Entry time").copy()
-    df["Cumulative P&L"] = df["Profit"].cumsum()
-    df["Drawdown"] = df["Cumulative P&L"] - df["Cumulative P&L"].cummax()
-    df["Trade #"] = range(1, len(df) + 1)
+    keep = downsample_minmax(data.drawdown, max_points)
+    curve = pd.DataFrame({"Trade #": data.trade_number[keep], "Drawdown": data.drawdown[keep]})
 
     fig = px.area(
-        df,
+        curve,
         x="Trade #",
         y="Drawdown",
         title="📉 Courbe de Drawdown (par trade)",
@@ -58,19 +196,14 @@ def plot_drawdown_curve(df):
     return fig
 
 
+@timed
 def plot_daily_drawdown(df):
-    if df.empty:
+    data = as_analytics(df)
+    if data.empty:
         return px.bar(title="Aucune donnée")
 
-    df = df.sort_values("Entry time")
-    df["Cumulative"] = df["Profit"].cumsum()
-    df["Drawdown"] = df["Cumulative"] - df["Cumulative"].cummax()
-    df["Date"] = df["Entry time"].dt.date
-
-    daily_min_dd = df.groupby("Date")["Drawdown"].min().reset_index()
-
     fig = px.bar(
-        daily_min_dd,
+        data.daily,
         x="Date",
         y="Drawdown",
         title="📉 Drawdown quotidien",
@@ -80,15 +213,14 @@ def plot_daily_drawdown(df):
     fig.update_yaxes(autorange="reversed")
     return fig
 
+@timed
 def plot_daily_pnl(df):
-    if df.empty:
+    data = as_analytics(df)
+    if data.empty:
         return px.bar(title="Aucune donnée")
 
-    df["Date"] = df["Entry time"].dt.date
-    daily_pnl = df.groupby("Date")["Profit"].sum().reset_index()
-
     fig = px.bar(
-        daily_pnl,
+        data.daily,
         x="Date",
         y="Profit",
         title="💵 Profit quotidien",
@@ -97,12 +229,42 @@ def plot_daily_pnl(df):
     fig.update_traces(marker_color=COLOR_PROFIT)
     return fig
 
+@timed
+def plot_equity_vs_market(df, market_closes):
+    # Capital cumulé (fin de journée, axe gauche) et variation en % des marchés
+    # sur la même période (axe droit). market_closes : {nom: Series Close indexée par Date}
+    data = as_analytics(df)
+    if data.empty:
+        return px.line(title="Aucune donnée")
+
+    daily = data.daily
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=daily["Date"], y=daily["Profit"].cumsum(), mode="lines",
+        name="Capital (P&L cumulé)", line=dict(color=COLOR_PROFIT, width=3),
+    ))
+    for name, close in market_closes.items():
+        change = (close / close.iloc[0] - 1) * 100
+        fig.add_trace(go.Scatter(x=change.index, y=change.to_numpy(), mode="lines", name=f"{name} (%)", yaxis="y2"))
+
+    fig.update_layout(
+        title="🌍 Capital vs marchés",
+        xaxis_title="Date",
+        yaxis=dict(title="P&L cumulé ($)"),
+        yaxis2=dict(title="Variation (%)", overlaying="y", side="right", showgrid=False),
+        legend=dict(orientation="h", y=-0.2),
+    )
+    return fig
+
+
+@timed
 def plot_gain_loss_pie(df):
-    if df.empty:
+    data = as_analytics(df)
+    if data.empty:
         return px.pie(title="Aucune donnée")
 
-    df["Profit Label"] = df["Profit"].apply(lambda x: "Gain" if x > 0 else "Perte")
-    pie_data = df["Profit Label"].value_counts().reset_index()
+    labels = pd.Series(np.where(data.profit > 0, "Gain", "Perte"), name="Profit Label")
+    pie_data = labels.value_counts().reset_index()
     pie_data.columns = ["Résultat", "Nombre"]
 
     fig = px.pie(
@@ -115,11 +277,13 @@ def plot_gain_loss_pie(df):
     fig.update_traces(textinfo="percent+label")
     return fig
 
+@timed
 def plot_asset_distribution(df):
-    if df.empty:
+    data = as_analytics(df)
+    if data.empty:
         return px.pie(title="Aucune donnée")
 
-    asset_counts = df["Instrument"].value_counts().reset_index()
+    asset_counts = data.trades["Instrument"].value_counts().reset_index()
     asset_counts.columns = ["Instrument", "Nombre de trades"]
 
     fig = px.pie(
@@ -132,12 +296,13 @@ def plot_asset_distribution(df):
     fig.update_traces(textinfo="percent+label")
     return fig
 
+@timed
 def plot_avg_duration_per_day(df):
-    if df.empty:
+    data = as_analytics(df)
+    if data.empty:
         return px.bar(title="Aucune donnée")
 
-    df["Date"] = df["Entry time"].dt.date
-    daily_avg = df.groupby("Date")["Durée (min)"].mean().reset_index()
+    daily_avg = data.daily.rename(columns={"Duration": "Durée (min)"})
 
     fig = px.bar(
         daily_avg,
@@ -150,54 +315,47 @@ def plot_avg_duration_per_day(df):
     fig.update_traces(marker_color=COLOR_PROFIT)
     return fig
 
-def plot_return_vs_duration(df):
-    if df.empty:
+@timed
+def plot_return_vs_duration(df, max_points=None):
+    data = as_analytics(df)
+    if data.empty:
         return px.scatter(title="Aucune donnée")
 
+    trades, title = _scatter_sample(
+        data.trades, "Durée (min)", "Rendement (%)", "📈 Scatter Plot : Rendement (%) vs Durée", max_points
+    )
     fig = px.scatter(
-        df,
+        trades,
         x="Durée (min)",
         y="Rendement (%)",
-        title="📈 Scatter Plot : Rendement (%) vs Durée",
+        title=title,
         labels={"Durée (min)": "Durée (min)", "Rendement (%)": "Rendement (%)"},
-        hover_data=["Entry time", "Instrument", "Profit"]
+        hover_data=["Entry time", "Instrument", "Profit"],
+        render_mode=scatter_render_mode(len(data.trades), max_points),
     )
     fig.update_traces(marker=dict(size=10, opacity=0.7, line=dict(width=1, color=COLOR_PROFIT)))
     return fig
 
+@timed
 def compute_stats_dict(df):
-    if df.empty:
-        return {
-            "total_trades": 0,
-            "winrate": 0,
-            "total_profit": 0,
-            "avg_gain": 0,
-            "avg_loss": 0,
-            "profit_factor": 0,
-            "max_drawdown": 0,
-            "avg_duration": 0,
-            "best_trade": 0,
-            "worst_trade": 0,
-            "sharpe_ratio": 0,
-        }
-
-    total_trades = len(df)
-    wins = df[df["Profit"] > 0]
-    losses = df[df["Profit"] < 0]
+    data = as_analytics(df)
+    if data.empty:
+        return dict(EMPTY_STATS)
+
+    profit = data.trades["Profit"]
+    total_trades = len(profit)
+    wins = profit[profit > 0]
+    losses = profit[profit < 0]
     winrate = round(len(wins) / total_trades * 100, 2)
-    total_profit = df["Profit"].sum()
-    avg_gain = round(wins["Profit"].mean(), 2) if not wins.empty else 0
-    avg_loss = round(losses["Profit"].mean(), 2) if not losses.empty else 0
-    profit_factor = round(wins["Profit"].sum() / abs(losses["Profit"].sum()), 2) if not losses.empty else 0
-    best_trade = df["Profit"].max()
-    worst_trade = df["Profit"].min()
-    avg_duration = round(df["Durée (min)"].mean(), 2)
-    sharpe_ratio = round(df["Profit"].mean() / df["Profit"].std(), 2) if df["Profit"].std() != 0 else 0
-
-    df = df.sort_values("Entry time")
-    df["Cumulative"] = df["Profit"].cumsum()
-    drawdown = df["Cumulative"] - df["Cumulative"].cummax()
-    max_drawdown = round(drawdown.min(), 2)
+    total_profit = profit.sum()
+    avg_gain = round(wins.mean(), 2) if not wins.empty else 0
+    avg_loss = round(losses.mean(), 2) if not losses.empty else 0
+    profit_factor = round(wins.sum() / abs(losses.sum()), 2) if not losses.empty else 0
+    best_trade = profit.max()
+    worst_trade = profit.min()
+    avg_duration = round(data.duration.mean(), 2)
+    sharpe_ratio = round(profit.mean() / profit.std(), 2) if profit.std() != 0 else 0
+    max_drawdown = round(data.drawdown.min(), 2)
 
     return {
         "total_trades": total_trades,
@@ -213,12 +371,152 @@ def compute_stats_dict(df):
         "sharpe_ratio": sharpe_ratio,
     }
 
+# ─────────────────────────────────────────────────────────────────────────
+# Statistiques glissantes : fenêtre des N derniers trades ou des N derniers jours
+#
+# Chaque trade j a une fenêtre [start_j, j]. Sommes, comptes et variances sont
+# des différences de sommes cumulées ; le max drawdown de chaque fenêtre est
+# obtenu par doublement (segments de 2^k points fusionnés), soit O(n log N)
+# opérations vectorisées au lieu d'une boucle sur les fenêtres.
+# ─────────────────────────────────────────────────────────────────────────
+ROLLING_UNITS = ("trades", "jours")
+
+
+def rolling_window_starts(data, window, unit="trades"):
+    # Position du premier trade de la fenêtre de chaque trade
+    n = len(data.profit)
+    if unit == "trades":
+        return np.maximum(np.arange(n) - (window - 1), 0)
+    times = data.trades["Entry time"].to_numpy()
+    return times.searchsorted(times - np.timedelta64(window, "D"), side="right")
+
+
+def window_max_drawdown(equity, starts, ends):
+    # Max drawdown (>= 0) de chaque tranche equity[starts:ends], tranches non vides.
+    # Un segment se résume à (max, min, drawdown) ; la fusion gauche + droite vaut
+    # (max, min, max(dd_g, dd_d, max_g - min_d)). Les tranches sont décomposées en
+    # segments de 2^k points, pris de gauche à droite par k croissant.
+    lengths = ends - starts
+    pos = starts.copy()
+    acc_max = np.full(len(starts), -np.inf)
+    acc_min = np.full(len(starts), np.inf)
+    acc_dd = np.zeros(len(starts))
+
+    seg_max, seg_min, seg_dd = equity, equity, np.zeros(len(equity))
+    k = 0
+    while True:
+        take = np.flatnonzero((lengths >> k) & 1)
+        if take.size:
+            at = pos[take]
+            acc_dd[take] = np.maximum.reduce([acc_dd[take], seg_dd[at], acc_max[take] - seg_min[at]])
+            acc_max[take] = np.maximum(acc_max[take], seg_max[at])
+            acc_min[take] = np.minimum(acc_min[take], seg_min[at])
+            pos[take] += 1 << k
+
+        half = 1 << k
+        if (lengths >> (k + 1)).max(initial=0) == 0 or len(seg_max) <= half:
+            break
+        # Segments de 2^(k+1) points à partir des segments de 2^k
+        right = slice(half, None)
+        seg_dd = np.maximum.reduce([seg_dd[:-half], seg_dd[right], seg_max[:-half] - seg_min[right]])
+        seg_max = np.maximum(seg_max[:-half], seg_max[right])
+        seg_min = np.minimum(seg_min[:-half], seg_min[right])
+        k += 1
+    return acc_dd
+
+
+@timed
+def compute_rolling_metrics(df, window, unit="trades"):
+    # Sharpe, winrate, profit factor et max drawdown sur la fenêtre glissante de chaque trade.
+    # Unité "trades" : les N derniers trades (valeurs à partir du N-ième trade) ;
+    # unité "jours" : les trades entrés dans les N derniers jours calendaires.
+    data = as_analytics(df)
+    n = len(data.profit)
+    if n == 0:
+        return pd.DataFrame(columns=["Trade #", "Entry time", "Sharpe", "Winrate (%)", "Profit Factor", "Max Drawdown"])
+
+    starts = rolling_window_starts(data, window, unit)
+    ends = np.arange(1, n + 1)
+
+    valid = ~np.isnan(data.profit)
+    profit = np.where(valid, data.profit, 0.0)
+    # Centrage avant les carrés : variance sans perte de précision sur les gros historiques
+    centered = np.where(valid, profit - profit[valid].mean() if valid.any() else 0.0, 0.0)
+
+    def window_sum(values):
+        cumulative = np.concatenate([[0.0], np.cumsum(values, dtype=float)])
+        return cumulative[ends] - cumulative[starts]
+
+    count = window_sum(valid)
+    wins = window_sum(profit > 0)
+    gross_win = window_sum(np.where(profit > 0, profit, 0.0))
+    gross_loss = -window_sum(np.where(profit < 0, profit, 0.0))
+    sum_centered = window_sum(centered)
+    sum_squares = window_sum(centered ** 2)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = sum_centered / count
+        variance = (sum_squares - sum_centered * mean) / (count - 1)
+        std = np.sqrt(np.maximum(variance, 0.0))
+        sharpe = np.where((count > 1) & (std > 0), (window_sum(profit) / count) / std, np.nan)
+        winrate = np.where(count > 0, wins / count * 100, np.nan)
+        profit_factor = np.where(gross_loss > 0, gross_win / gross_loss, np.nan)
+
+    # Drawdown mesuré depuis le capital juste avant le premier trade de la fenêtre
+    equity = np.concatenate([[0.0], data.cumulative])
+    max_drawdown = -window_max_drawdown(equity, starts, ends + 1)
+
+    metrics = pd.DataFrame({
+        "Trade #": data.trade_number,
+        "Entry time": data.trades["Entry time"].to_numpy(),
+        "Sharpe": sharpe,
+        "Winrate (%)": winrate,
+        "Profit Factor": profit_factor,
+        "Max Drawdown": max_drawdown,
+    })
+    if unit == "trades":
+        metrics.iloc[: window - 1, 2:] = np.nan
+    return metrics
+
+
+@timed
+def plot_rolling_metrics(df, window, unit="trades", max_points=None):
+    data = as_analytics(df)
+    if data.empty:
+        return px.line(title="Aucune donnée")
+
+    metrics = compute_rolling_metrics(data, window, unit)
+    panels = [
+        ("Sharpe", COLOR_PROFIT),
+        ("Winrate (%)", COLOR_PRESENCE),
+        ("Profit Factor", COLOR_ABSENCE),
+        ("Max Drawdown", COLOR_DRAWDOWN),
+    ]
+    fig = make_subplots(rows=2, cols=2, shared_xaxes=True, subplot_titles=[name for name, _ in panels])
+    for i, (name, color) in enumerate(panels):
+        values = metrics[name].to_numpy()
+        keep = downsample_minmax(np.nan_to_num(values), max_points)
+        fig.add_trace(
+            go.Scatter(
+                x=metrics["Trade #"].to_numpy()[keep],
+                y=values[keep],
+                mode="lines",
+                name=name,
+                line=dict(color=color),
+            ),
+            row=i // 2 + 1,
+            col=i % 2 + 1,
+        )
+    fig.update_layout(title=f"🔁 Statistiques glissantes ({window} derniers {unit})", showlegend=False)
+    return fig
+
+@timed
 def plot_pnl_by_hour(df):
-    if df.empty:
+    data = as_analytics(df)
+    if data.empty:
         return px.bar(title="Aucune donnée")
 
-    df["Hour"] = df["Entry time"].dt.hour
-    hourly_pnl = df.groupby("Hour")["Profit"].sum().reset_index()
+    hourly_pnl = data.hourly.rename_axis("Hour").reset_index()
 
     fig = px.bar(
         hourly_pnl,
@@ -231,15 +529,14 @@ def plot_pnl_by_hour(df):
     fig.update_traces(marker_color=COLOR_PROFIT)
     return fig
 
+@timed
 def plot_pnl_by_day_of_week(df):
-    if df.empty:
+    data = as_analytics(df)
+    if data.empty:
         return px.bar(title="Aucune donnée")
 
-    df["Day"] = df["Entry time"].dt.dayofweek
     day_map = {0: "Lundi", 1: "Mardi", 2: "Mercredi", 3: "Jeudi", 4: "Vendredi", 5: "Samedi", 6: "Dimanche"}
-    df["Day"] = df["Day"].map(day_map)
-
-    daily_pnl = df.groupby("Day")["Profit"].sum().reindex(["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]).reset_index()
+    daily_pnl = data.by_weekday.reindex(range(7)).rename(index=day_map).rename_axis("Day").reset_index()
 
     fig = px.bar(
         daily_pnl,
@@ -251,11 +548,37 @@ def plot_pnl_by_day_of_week(df):
     fig.update_traces(marker_color=COLOR_PROFIT)
     return fig
 
+@timed
+def plot_pnl_heatmap_weekday_hour(df):
+    data = as_analytics(df)
+    if data.empty:
+        return px.imshow([[0]], title="Aucune donnée")
+
+    day_names = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+    grid = data.timing.unstack("Hour").reindex(index=range(7), columns=range(24))
+    # Les jours sans aucun trade (souvent le week-end) ne sont pas affichés
+    grid = grid.dropna(how="all")
+
+    fig = px.imshow(
+        grid.to_numpy(),
+        x=list(range(24)),
+        y=[day_names[d] for d in grid.index],
+        color_continuous_scale=[COLOR_DRAWDOWN, "#f9fafb", COLOR_PROFIT],
+        color_continuous_midpoint=0,
+        aspect="auto",
+        title="🗓️ PnL par Jour × Heure d’entrée",
+        labels={"x": "Heure (0-23)", "y": "Jour", "color": "PnL"},
+    )
+    fig.update_layout(xaxis=dict(dtick=1))
+    return fig
+
+@timed
 def plot_market_position_distribution(df):
-    if df.empty:
+    data = as_analytics(df)
+    if data.empty:
         return px.pie(title="Aucune donnée")
 
-    pos_counts = df["Market pos."].value_counts().reset_index()
+    pos_counts = data.trades["Market pos."].value_counts().reset_index()
     pos_counts.columns = ["Position", "Nombre"]
 
     fig = px.pie(
@@ -269,7 +592,9 @@ def plot_market_position_distribution(df):
     return fig
 
 
+@timed
 def plot_histogram_mae_mfe_etd(df):
+    df = as_analytics(df).trades
     if df.empty or not all(x in df.columns for x in ["MAE", "MFE", "ETD"]):
         fig = go.Figure()
         fig.update_layout(title="Aucune donnée", template="plotly_dark")
@@ -290,21 +615,94 @@ def plot_histogram_mae_mfe_etd(df):
     fig.update_traces(opacity=0.65)
     return fig
 
-def plot_scatter_mfe_vs_profit(df):
-    if df.empty:
+@timed
+def plot_scatter_mfe_vs_profit(df, max_points=None):
+    data = as_analytics(df)
+    if data.empty:
         return px.scatter(title="Aucune donnée")
 
+    trades, title = _scatter_sample(data.trades, "MFE", "Profit", "🔁 MFE vs Profit réalisé", max_points)
     fig = px.scatter(
-        df,
+        trades,
         x="MFE",
         y="Profit",
-        title="🔁 MFE vs Profit réalisé",
+        title=title,
         labels={"MFE": "Max Favorable Excursion", "Profit": "Profit réalisé"},
-        hover_data=["Entry time", "Exit time", "Instrument"]
+        hover_data=["Entry time", "Exit time", "Instrument"],
+        render_mode=scatter_render_mode(len(data.trades), max_points),
     )
     fig.update_traces(marker=dict(size=10, opacity=0.7))
     return fig
 
+STOP_TARGET_METRICS = {
+    "total_pnl": "PnL total",
+    "winrate": "Winrate (%)",
+    "profit_factor": "Profit Factor",
+}
+
+
+@timed
+def plot_stop_target_heatmap(result, metric="total_pnl"):
+    # result : sortie de target_simulator.simulate_stop_target
+    if result is None:
+        return px.imshow([[0]], title="Aucune donnée")
+
+    label = STOP_TARGET_METRICS[metric]
+    fig = px.imshow(
+        result[metric],
+        x=np.round(result["targets"], 2),
+        y=np.round(result["stops"], 2),
+        origin="lower",
+        aspect="auto",
+        color_continuous_scale="RdBu" if metric == "total_pnl" else "Blues",
+        color_continuous_midpoint=0 if metric == "total_pnl" else None,
+        title=f"🎯 Simulation stop / target : {label}",
+        labels={"x": "Target ($)", "y": "Stop ($)", "color": label},
+    )
+    return fig
+
+@timed
+def plot_monte_carlo_bands(result):
+    # result : sortie de monte_carlo.run_monte_carlo
+    if result is None:
+        return px.line(title="Aucune donnée")
+
+    x = result["trade_number"]
+    bands = result["bands"]
+    fig = go.Figure()
+    for low, high, opacity in ((5, 95, 0.15), (25, 75, 0.3)):
+        fig.add_trace(go.Scatter(x=x, y=bands[high], mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip"))
+        fig.add_trace(go.Scatter(
+            x=x, y=bands[low], mode="lines", line=dict(width=0), fill="tonexty",
+            fillcolor=f"rgba(59, 130, 246, {opacity})", name=f"{low}–{high} %",
+        ))
+    fig.add_trace(go.Scatter(x=x, y=bands[50], mode="lines", line=dict(color=COLOR_PROFIT, dash="dash"), name="Médiane"))
+    fig.add_trace(go.Scatter(x=x, y=result["historical_equity"], mode="lines", line=dict(color="#fafafa"), name="Historique"))
+    fig.update_layout(
+        title=f"🎲 Monte Carlo : bandes de capital ({result['n_sims']} tirages, {result['method']})",
+        xaxis_title="Trade #",
+        yaxis_title="Profit Cumulé",
+    )
+    return fig
+
+
+@timed
+def plot_monte_carlo_drawdowns(result):
+    if result is None:
+        return px.histogram(title="Aucune donnée")
+
+    fig = px.histogram(
+        x=result["max_drawdown"],
+        nbins=60,
+        title="📉 Distribution du Max Drawdown simulé",
+        labels={"x": "Max Drawdown"},
+    )
+    fig.update_traces(marker_color=COLOR_DRAWDOWN)
+    fig.add_vline(x=result["historical_max_drawdown"], line_dash="dash", line_color="#fafafa", annotation_text="Historique")
+    fig.update_layout(yaxis_title="Tirages")
+    return fig
+
+@timed
 def plot_heatmap_mae_vs_mfe(df):
     if df.empty:
         return px.density_heatmap(title="Aucune donnée")
@@ -322,6 +720,7 @@ def plot_heatmap_mae_vs_mfe(df):
     return fig
 
 
+@timed
 def plot_presence_timeline(df, selected_month):
     if df.empty:
         return px.scatter(title="Aucune donnée")
@@ -369,6 +768,7 @@ def plot_presence_timeline(df, selected_month):
     return fig
 
 
+@timed
 def plot_presence_histogram(df, selected_month):
     if df.empty:
         return px.bar(title="Aucune donnée")